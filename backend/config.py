@@ -0,0 +1,15 @@
+"""
+GridZen - Runtime Configuration
+Operator-adjustable optimizer settings shared by the API, the simulator and
+the ingest path. Updated in place so every importer sees the same object.
+"""
+
+from pydantic import BaseModel
+
+
+class OptimizationConfig(BaseModel):
+    mode: str = "AUTO"  # "AUTO", "MANUAL_CHARGE", "MANUAL_DISCHARGE"
+    manual_override_kw: float = 0.0
+
+
+current_opt_config = OptimizationConfig()
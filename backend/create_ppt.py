@@ -1,118 +1,87 @@
 from pptx import Presentation
 from pptx.util import Inches, Pt
 
-def create_presentation(filename="HELIX_Project_Documentation.pptx"):
-    prs = Presentation()
+TITLE = "HELIX: Hybrid Renewable Energy VPP"
+SUBTITLE = "Intelligent Virtual Power Plant Orchestration\nProject Documentation"
 
-    # Slide 1: Title Slide
-    slide = prs.slides.add_slide(prs.slide_layouts[0])
-    title = slide.shapes.title
-    subtitle = slide.placeholders[1]
-    title.text = "HELIX: Hybrid Renewable Energy VPP"
-    subtitle.text = "Intelligent Virtual Power Plant Orchestration\nProject Documentation"
+# Deck content as data: one entry per bullet slide, rendered in a single pass
+# over the "Title and Content" layout. The first bullet fills the text frame,
+# the rest are appended as paragraphs.
+SLIDES = [
+    {
+        "title": "I. The Problem Statement & Solution (1/2)",
+        "bullets": [
+            "The Problem:",
+            "• Renewable Energy Curtailment: Excess solar and wind energy is often wasted or curtailed when grid demand is low.",
+            "• Fossil Fuel Dependency: Grids are forced to rely on dirty backup generation (like coal or diesel) when weather restricts renewable output.",
+            "• Unorchestrated Grids: A lack of real-time intelligence at campus and regional boundaries leads to highly inefficient energy distribution and utilization.",
+        ],
+    },
+    {
+        "title": "I. The Problem Statement & Solution (2/2)",
+        "bullets": [
+            "The Solution - HELIX:",
+            "• Intelligent Virtual Power Plant (VPP): Unified orchestration of separate energy sources (Solar, Wind, Hydro, and Biomass) into a single smart micro-grid.",
+            "• Real-Time Arbitrage: Deep integration with battery storage to cache surplus energy instantly and supply deficits autonomously.",
+            "• Predictive AI-Driven Orchestration: Uses forward-looking 48-hour weather forecasts to proactively dictate charge & discharge cycles based on expected generation.",
+        ],
+    },
+    {
+        "title": "II. Tools and Technologies Used",
+        "bullets": [
+            "Frontend (User Interface):",
+            "• React.js & Vite: Powering a high-performance 60FPS dynamic dashboard UI.",
+            "• Vanilla CSS: Implemented with modern CSS Variables for a dynamic, sleek design system.",
+            "\nBackend (Core Engine & API):",
+            "• Python with FastAPI: For lightning-fast REST Endpoints and concurrency.",
+            "• WebSockets: For real-time telemetry streaming straight to the frontend.",
+            "• SQLAlchemy & SQLite: For lightweight, real-time application state persistence.",
+        ],
+    },
+    {
+        "title": "III. Implementation Details",
+        "bullets": [
+            "Key Technical Milestones:",
+            "• Live Data Ingestion Pipeline: Processes live dataset feeds mimicking continuous 100ms IoT sensor polling.",
+            "• Optimization Engine: Autonomously adjusts battery charge/discharge rates using Time-of-Use pricing logic to dodge expensive grid tariffs during peak hours.",
+            "• Forecasting Integration: Consumes Open-Meteo forecasts to predict structural deficits up to 48 hours in advance.",
+            "• Actionable Recommendation Feed: Auto-generates real-time, human-readable insights for dashboard operators (e.g., 'Warning: Shifting HVAC load to Solar peak').",
+        ],
+    },
+    {
+        "title": "IV. Screenshots & Repository Links",
+        "bullets": [
+            "[Please insert screenshots of the HELIX Dashboard here]",
+            "\nGitHub Repository:",
+            "• https://github.com/[your-username]/HELIX-VPP",
+            "\nLive Hosted Demo:",
+            "• Frontend Hosted on [Vercel/Netlify]: https://helix-[insert-app].vercel.app",
+            "• Backend Hosted on [Render/Railway]",
+        ],
+    },
+]
 
-    # Slide 2: Problem Statement
-    slide = prs.slides.add_slide(prs.slide_layouts[1])
-    title = slide.shapes.title
-    title.text = "I. The Problem Statement & Solution (1/2)"
-    content = slide.placeholders[1]
-    tf = content.text_frame
-    tf.text = "The Problem:"
-    
-    p = tf.add_paragraph()
-    p.text = "• Renewable Energy Curtailment: Excess solar and wind energy is often wasted or curtailed when grid demand is low."
-    
-    p = tf.add_paragraph()
-    p.text = "• Fossil Fuel Dependency: Grids are forced to rely on dirty backup generation (like coal or diesel) when weather restricts renewable output."
-    
-    p = tf.add_paragraph()
-    p.text = "• Unorchestrated Grids: A lack of real-time intelligence at campus and regional boundaries leads to highly inefficient energy distribution and utilization."
 
-    # Slide 3: Solution
+def _add_bullet_slide(prs, spec):
     slide = prs.slides.add_slide(prs.slide_layouts[1])
-    title = slide.shapes.title
-    title.text = "I. The Problem Statement & Solution (2/2)"
-    content = slide.placeholders[1]
-    tf = content.text_frame
-    tf.text = "The Solution - HELIX:"
-    
-    p = tf.add_paragraph()
-    p.text = "• Intelligent Virtual Power Plant (VPP): Unified orchestration of separate energy sources (Solar, Wind, Hydro, and Biomass) into a single smart micro-grid."
-    
-    p = tf.add_paragraph()
-    p.text = "• Real-Time Arbitrage: Deep integration with battery storage to cache surplus energy instantly and supply deficits autonomously."
-    
-    p = tf.add_paragraph()
-    p.text = "• Predictive AI-Driven Orchestration: Uses forward-looking 48-hour weather forecasts to proactively dictate charge & discharge cycles based on expected generation."
+    slide.shapes.title.text = spec["title"]
+    tf = slide.placeholders[1].text_frame
+    first, *rest = spec["bullets"]
+    tf.text = first
+    for bullet in rest:
+        tf.add_paragraph().text = bullet
 
-    # Slide 4: Tools and Technologies Used
-    slide = prs.slides.add_slide(prs.slide_layouts[1])
-    title = slide.shapes.title
-    title.text = "II. Tools and Technologies Used"
-    content = slide.placeholders[1]
-    tf = content.text_frame
-    tf.text = "Frontend (User Interface):"
-    
-    p = tf.add_paragraph()
-    p.text = "• React.js & Vite: Powering a high-performance 60FPS dynamic dashboard UI."
-    
-    p = tf.add_paragraph()
-    p.text = "• Vanilla CSS: Implemented with modern CSS Variables for a dynamic, sleek design system."
-    
-    p = tf.add_paragraph()
-    p.text = "\nBackend (Core Engine & API):"
-    
-    p = tf.add_paragraph()
-    p.text = "• Python with FastAPI: For lightning-fast REST Endpoints and concurrency."
-    
-    p = tf.add_paragraph()
-    p.text = "• WebSockets: For real-time telemetry streaming straight to the frontend."
-    
-    p = tf.add_paragraph()
-    p.text = "• SQLAlchemy & SQLite: For lightweight, real-time application state persistence."
 
-    # Slide 5: Implementation Details
-    slide = prs.slides.add_slide(prs.slide_layouts[1])
-    title = slide.shapes.title
-    title.text = "III. Implementation Details"
-    content = slide.placeholders[1]
-    tf = content.text_frame
-    tf.text = "Key Technical Milestones:"
-    
-    p = tf.add_paragraph()
-    p.text = "• Live Data Ingestion Pipeline: Processes live dataset feeds mimicking continuous 100ms IoT sensor polling."
-    
-    p = tf.add_paragraph()
-    p.text = "• Optimization Engine: Autonomously adjusts battery charge/discharge rates using Time-of-Use pricing logic to dodge expensive grid tariffs during peak hours."
-    
-    p = tf.add_paragraph()
-    p.text = "• Forecasting Integration: Consumes Open-Meteo forecasts to predict structural deficits up to 48 hours in advance."
-    
-    p = tf.add_paragraph()
-    p.text = "• Actionable Recommendation Feed: Auto-generates real-time, human-readable insights for dashboard operators (e.g., 'Warning: Shifting HVAC load to Solar peak')."
+def create_presentation(filename="HELIX_Project_Documentation.pptx"):
+    prs = Presentation()
 
-    # Slide 6: Screenshots & Links
-    slide = prs.slides.add_slide(prs.slide_layouts[1])
-    title = slide.shapes.title
-    title.text = "IV. Screenshots & Repository Links"
-    content = slide.placeholders[1]
-    tf = content.text_frame
-    tf.text = "[Please insert screenshots of the HELIX Dashboard here]"
-    
-    p = tf.add_paragraph()
-    p.text = "\nGitHub Repository:"
-    
-    p = tf.add_paragraph()
-    p.text = "• https://github.com/[your-username]/HELIX-VPP"
-    
-    p = tf.add_paragraph()
-    p.text = "\nLive Hosted Demo:"
-    
-    p = tf.add_paragraph()
-    p.text = "• Frontend Hosted on [Vercel/Netlify]: https://helix-[insert-app].vercel.app"
-    
-    p = tf.add_paragraph()
-    p.text = "• Backend Hosted on [Render/Railway]"
+    # Slide 1: Title Slide
+    slide = prs.slides.add_slide(prs.slide_layouts[0])
+    slide.shapes.title.text = TITLE
+    slide.placeholders[1].text = SUBTITLE
+
+    for spec in SLIDES:
+        _add_bullet_slide(prs, spec)
 
     prs.save(filename)
     print(f"Presentation saved successfully as {filename}")
@@ -5,8 +5,10 @@ SQLAlchemy async ORM definitions for time-series energy data.
 
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import Integer, Float, String, DateTime, func
-from datetime import datetime
+from sqlalchemy import Integer, Float, String, DateTime, Index, func, event, insert, select
+from sqlalchemy.schema import CreateIndex
+from datetime import datetime, date
+from typing import Optional
 import os
 from dotenv import load_dotenv
 
@@ -14,10 +16,37 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./gridzen.db")
 
-engine = create_async_engine(DATABASE_URL, echo=False)
+# Plain Postgres URLs are routed to asyncpg, the native async driver
+for _prefix in ("postgresql://", "postgres://", "postgresql+psycopg2://"):
+    if DATABASE_URL.startswith(_prefix):
+        DATABASE_URL = "postgresql+asyncpg://" + DATABASE_URL[len(_prefix):]
+        break
+
+# Each reading covers one 5-second simulator tick → kW × 5/3600 = kWh
+READING_INTERVAL_H = 5 / 3600
+
+# SQLite is a single file; only server databases get a sized connection pool
+_pool_args = {} if DATABASE_URL.startswith("sqlite") else {
+    "pool_size":     int(os.getenv("DB_POOL_SIZE", 20)),
+    "max_overflow":  int(os.getenv("DB_MAX_OVERFLOW", 10)),
+    "pool_pre_ping": True,
+}
+
+engine = create_async_engine(DATABASE_URL, echo=False, **_pool_args)
 AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 
 
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine.sync_engine, "connect")
+    def _sqlite_pragmas(dbapi_conn, _record):
+        """WAL lets readers run alongside the 5 s writer; NORMAL sync is safe under WAL."""
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+
 class Base(DeclarativeBase):
     pass
 
@@ -51,6 +80,10 @@ class EnergyReading(Base):
     cost_saved_inr: Mapped[float] = mapped_column(Float, default=0.0)
 
 
+# Expression index so daily GROUP BY date(timestamp) rollups are an index scan
+ix_energy_readings_day = Index("ix_energy_readings_day", func.date(EnergyReading.timestamp))
+
+
 class Recommendation(Base):
     """AI-generated actionable recommendations."""
     __tablename__ = "recommendations"
@@ -64,6 +97,15 @@ class Recommendation(Base):
     is_active: Mapped[bool] = mapped_column(default=True)
 
 
+# Partial index over just the active rows, so deactivating the previous
+# set touches a handful of entries instead of scanning every recommendation
+ix_recommendations_active = Index(
+    "ix_recommendations_active", Recommendation.is_active,
+    sqlite_where=Recommendation.is_active == True,
+    postgresql_where=Recommendation.is_active == True,
+)
+
+
 class DailySummary(Base):
     """Aggregated daily stats for reporting."""
     __tablename__ = "daily_summaries"
@@ -81,9 +123,83 @@ class DailySummary(Base):
 
 
 async def init_db():
-    """Create all tables on startup."""
+    """Create all tables on startup, plus indexes added after a database was first created."""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        # create_all only builds indexes together with a new table
+        for index in (ix_energy_readings_day, ix_recommendations_active):
+            await conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+async def bulk_insert_readings(session: AsyncSession, rows: list[dict]):
+    """
+    Insert many readings with one executemany, bypassing the ORM unit of work.
+    Callers should batch 10–50 rows per call; committing is left to the caller.
+    """
+    if rows:
+        await session.execute(insert(EnergyReading), rows)
+
+
+async def replace_active_recommendations(session: AsyncSession, recs: list[dict]):
+    """
+    Deactivate the current recommendations and insert `recs` as the new
+    active set. On Postgres both happen in one statement (the UPDATE runs
+    as a writable CTE); elsewhere it is an UPDATE plus one executemany.
+    Committing is left to the caller.
+    """
+    deactivate = Recommendation.__table__.update().where(Recommendation.is_active == True).values(is_active=False)
+    if recs and engine.dialect.name == "postgresql":
+        rows = [{**rec, "is_active": True} for rec in recs]
+        await session.execute(insert(Recommendation).values(rows).add_cte(deactivate.cte("deactivated")))
+        return
+    await session.execute(deactivate)
+    if recs:
+        await session.execute(insert(Recommendation), recs)
+
+
+async def rollup_daily_summaries(session: AsyncSession, since: Optional[date] = None) -> int:
+    """
+    Recompute DailySummary rows from energy_readings with a single
+    GROUP BY date(timestamp) query, so the aggregation runs in the database
+    instead of over rows loaded into Python. Returns the number of days
+    written; committing is left to the caller.
+    """
+    day = func.date(EnergyReading.timestamp)
+    stmt = select(
+        day.label("day"),
+        func.sum(EnergyReading.solar_kw).label("solar"),
+        func.sum(EnergyReading.wind_kw).label("wind"),
+        func.sum(EnergyReading.load_kw).label("load"),
+        func.sum(EnergyReading.grid_import_kw).label("grid_import"),
+        func.sum(EnergyReading.grid_export_kw).label("grid_export"),
+        func.sum(EnergyReading.co2_saved_kg).label("co2"),
+        func.sum(EnergyReading.cost_saved_inr).label("cost"),
+        func.avg(EnergyReading.self_consumption_pct).label("self_consumption"),
+    ).group_by(day)
+    if since is not None:
+        # Bind a naive datetime like the column: asyncpg won't encode a date as a timestamp
+        stmt = stmt.where(EnergyReading.timestamp >= datetime.combine(since, datetime.min.time()))
+
+    rows = (await session.execute(stmt)).all()
+    days = [str(r.day) for r in rows]
+    existing = {
+        s.date: s
+        for s in (await session.execute(select(DailySummary).where(DailySummary.date.in_(days)))).scalars()
+    }
+    for key, r in zip(days, rows):
+        summary = existing.get(key)
+        if summary is None:
+            summary = DailySummary(date=key)
+            session.add(summary)
+        summary.total_solar_kwh          = (r.solar or 0) * READING_INTERVAL_H
+        summary.total_wind_kwh           = (r.wind or 0) * READING_INTERVAL_H
+        summary.total_load_kwh           = (r.load or 0) * READING_INTERVAL_H
+        summary.total_grid_import_kwh    = (r.grid_import or 0) * READING_INTERVAL_H
+        summary.total_grid_export_kwh    = (r.grid_export or 0) * READING_INTERVAL_H
+        summary.total_co2_saved_kg       = r.co2 or 0
+        summary.total_cost_saved_inr     = r.cost or 0
+        summary.avg_self_consumption_pct = r.self_consumption or 0
+    return len(rows)
 
 
 async def get_db() -> AsyncSession:
@@ -10,13 +10,19 @@ from datetime import datetime, timezone, timedelta
 import math
 import random
 
-API_URL = "http://127.0.0.1:8000/api/v1/ingest"
+API_URL = "http://127.0.0.1:8000/api/v1/ingest_batch"
 
 # Hardware specs matching simulator
 SOLAR_CAP_KW = 50.0
 WIND_CAP_KW = 15.0
 
-async def inject_reading(client, minutes_offset, is_cloudy=False):
+# Readings per POST (persisted by the backend in one transaction). Batches
+# are sent one after another: the backend advances battery SOC in arrival
+# order, so concurrent batches would scramble the scripted timeline.
+BATCH_SIZE = 10
+
+def build_reading(minutes_offset, is_cloudy=False):
+    """Return (local_hour, payload) for one simulated 5-minute tick."""
     # Simulated time
     now_utc = datetime.now(timezone.utc) + timedelta(minutes=minutes_offset)
     hour = now_utc.hour + now_utc.minute / 60.0
@@ -49,13 +55,16 @@ async def inject_reading(client, minutes_offset, is_cloudy=False):
         "load_kw": max(5.0, load_kw),
         "battery_soc_pct": 50.0  # Backend optimization calculates actual SOC delta
     }
+    return local_hour, payload
 
+async def inject_batch(client, batch):
     try:
-        response = await client.post(API_URL, json=payload, timeout=5.0)
+        response = await client.post(API_URL, json={"readings": [p for _, p in batch]}, timeout=5.0)
         res_data = response.json()
-        print(f"[{local_hour:05.2f}] Gen: {solar_kw+wind_kw:05.1f}kW | Load: {load_kw:05.1f}kW | Batt Pwr: {res_data['reading']['battery_power_kw']:05.1f}kW | Strat: {res_data['reading']['active_strategy']}")
+        for (local_hour, _), r in zip(batch, res_data["readings"]):
+            print(f"[{local_hour:05.2f}] Gen: {r['solar_kw']+r['wind_kw']:05.1f}kW | Load: {r['load_kw']:05.1f}kW | Batt Pwr: {r['battery_power_kw']:05.1f}kW | Strat: {r['active_strategy']}")
     except Exception as e:
-        print(f"Failed to push reading: {e}")
+        print(f"Failed to push batch: {e}")
 
 async def run_scenario():
     print("--- Starting GridZen Demo Scenario Injection ---")
@@ -64,24 +73,21 @@ async def run_scenario():
     # Calculate offset to start simulation exactly at 10:00 local time today
     now = datetime.now(timezone.utc)
     target_local_start = now.replace(hour=4, minute=30, second=0, microsecond=0) # 10:00 IST is 04:30 UTC
+    start_offset = (target_local_start - now).total_seconds() / 60
     
-    # Push 1 reading per simulated 5-minutes
+    # Simulate 6 hours (72 five-minute ticks); the "Storm" hits at 13:30 (tick 42)
+    storm_tick = 42
+    readings = [build_reading(i * 5 + start_offset, i >= storm_tick) for i in range(72)]
+
+    # Push BATCH_SIZE readings per request, in timeline order, over one
+    # keep-alive connection
     async with httpx.AsyncClient() as client:
-        # Simulate 6 hours (72 five-minute ticks)
-        for i in range(72):
-            sim_minutes = i * 5
-            
-            # The "Storm" hits at 13:30 (tick 42)
-            is_cloudy = sim_minutes >= (3.5 * 60)
-            
-            if i == 42:
+        for i in range(0, len(readings), BATCH_SIZE):
+            if i <= storm_tick < i + BATCH_SIZE:
                 print("\n☁️ ⛈️  SUDDEN CLOUD COVER & LOAD SPIKE EVENT TRIGGERED! ⛈️ ☁️\n")
-            
-            # Since our backend logic depends on real-time execution to track battery SOC delta 
-            # and our DB depends on a 5-second tick loop, we space the API calls quickly.
-            # We are injecting data into the backend "live".
-            await inject_reading(client, sim_minutes + (target_local_start - now).total_seconds()/60, is_cloudy)
-            await asyncio.sleep(0.5) # Send 2 readings per second for dramatic effect
+            await inject_batch(client, readings[i:i + BATCH_SIZE])
+            # Short pause keeps the dashboard animation visible
+            await asyncio.sleep(0.1)
             
     print("--- Scenario Complete ---")
 
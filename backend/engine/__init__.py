@@ -3,10 +3,8 @@ GridZen Engine Package
 """
 from .ingestion import IngestionPipeline, get_pipeline
 from .forecaster import EnergyForecaster, get_forecaster
-from .optimizer  import BatteryOptimizer, get_optimizer
 
 __all__ = [
     "IngestionPipeline", "get_pipeline",
     "EnergyForecaster",  "get_forecaster",
-    "BatteryOptimizer",  "get_optimizer",
 ]
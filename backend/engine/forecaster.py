@@ -8,7 +8,7 @@ next 24 hours.
 Architecture
 ────────────
   ┌─────────────────┐    ┌──────────────────┐    ┌──────────────────────┐
-  │ Open-Meteo API  │───▶│ Feature Builder  │───▶│  RandomForest Model  │
+  │ Open-Meteo API  │───▶│ Feature Builder  │───▶│  HistGBM per target  │
   │ (irradiance,    │    │ (hour, dayofweek,│    │  solar_kw_pred       │
   │  wind, cloud)   │    │  cloud, wind …)  │    │  wind_kw_pred        │
   └─────────────────┘    └──────────────────┘    │  load_kw_pred        │
@@ -24,16 +24,14 @@ hours of real data. When real readings accumulate it retrains automatically.
 
 from __future__ import annotations
 
-import math, random, os
+import logging, math, multiprocessing, os, threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
 from datetime  import datetime, timezone, timedelta
 from typing    import List, Dict, Any, Optional
 
 import numpy  as np
-import pandas as pd
-from sklearn.ensemble       import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.preprocessing  import StandardScaler
-from sklearn.pipeline       import Pipeline
-from sklearn.multioutput    import MultiOutputRegressor
+from sklearn.ensemble       import HistGradientBoostingRegressor
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -42,28 +40,44 @@ SOLAR_CAP   = float(os.getenv("SOLAR_CAPACITY_KW",  50.0))
 WIND_CAP    = float(os.getenv("WIND_CAPACITY_KW",   15.0))
 LATITUDE    = float(os.getenv("LATITUDE",            26.9124))
 
+TARGETS     = ("solar_kw", "wind_kw", "load_kw")
+
+logger = logging.getLogger(__name__)
+
 
 # ── Feature engineering ───────────────────────────────────────────────────────
 
-def _solar_angle(hour: float, lat_deg: float = LATITUDE) -> float:
-    """Simplified solar elevation angle (0-1 normalised)."""
-    lat   = math.radians(lat_deg)
-    decl  = math.radians(23.45 * math.sin(math.radians(360 / 365 * (datetime.now().timetuple().tm_yday - 81))))
-    ha    = math.radians((hour - 12) * 15)
-    sin_el = (math.sin(lat) * math.sin(decl) + math.cos(lat) * math.cos(decl) * math.cos(ha))
-    return max(0.0, min(1.0, sin_el))
+def _day_of_year() -> int:
+    return datetime.now().timetuple().tm_yday
 
 
-def build_features(
-    hour: float,
-    weekday: int,       # 0=Mon … 6=Sun
-    month: int,
-    cloud_cover: float, # 0-100 %
-    wind_speed_kmh: float,
-    temperature: float = 28.0,
+def _solar_angle(hour, yday: int, lat_deg: float = LATITUDE):
+    """
+    Simplified solar elevation angle (0-1 normalised).
+
+    Pure function of its arguments: accepts a scalar hour or an ndarray of
+    hours; the declination for `yday` is computed once per call and
+    broadcast over the hour vector.
+    """
+    lat   = math.radians(lat_deg)
+    decl  = math.radians(23.45 * math.sin(math.radians(360 / 365 * (yday - 81))))
+    ha    = np.radians((np.asarray(hour, dtype=np.float64) - 12) * 15)
+    sin_el = (math.sin(lat) * math.sin(decl) + math.cos(lat) * math.cos(decl) * np.cos(ha))
+    return np.clip(sin_el, 0.0, 1.0)
+
+
+def build_features_batch(
+    hours: np.ndarray,
+    weekdays: np.ndarray,   # 0=Mon … 6=Sun
+    months: np.ndarray,
+    clouds: np.ndarray,     # 0-100 %
+    winds: np.ndarray,      # km/h
+    temps: np.ndarray,
+    yday: Optional[int] = None,
 ) -> np.ndarray:
     """
-    Return a 1-D feature vector for a single forecast hour.
+    Return an (N, 12) float32 feature matrix for N forecast hours.
+    `yday` (day of year) defaults to today and is resolved once per batch.
 
     Features
     --------
@@ -77,134 +91,247 @@ def build_features(
     10: is_weekend                    – 0/1
     11: is_daytime                    – 0/1
     """
-    h_sin = math.sin(2 * math.pi * hour / 24)
-    h_cos = math.cos(2 * math.pi * hour / 24)
-    d_sin = math.sin(2 * math.pi * weekday / 7)
-    d_cos = math.cos(2 * math.pi * weekday / 7)
-    m_sin = math.sin(2 * math.pi * month / 12)
-    m_cos = math.cos(2 * math.pi * month / 12)
-
-    return np.array([
-        h_sin, h_cos,
-        d_sin, d_cos,
-        m_sin, m_cos,
-        _solar_angle(hour),
-        cloud_cover / 100.0,
-        min(wind_speed_kmh / 60.0, 1.0),
-        (temperature - 15.0) / 30.0,
-        1.0 if weekday >= 5 else 0.0,
-        1.0 if 6.5 <= hour <= 18.5 else 0.0,
-    ], dtype=np.float32)
+    h = np.asarray(hours,    dtype=np.float64)
+    d = np.asarray(weekdays, dtype=np.float64)
+    m = np.asarray(months,   dtype=np.float64)
+    two_pi = 2 * np.pi
+
+    return np.column_stack((
+        np.sin(two_pi * h / 24), np.cos(two_pi * h / 24),
+        np.sin(two_pi * d / 7),  np.cos(two_pi * d / 7),
+        np.sin(two_pi * m / 12), np.cos(two_pi * m / 12),
+        _solar_angle(h, _day_of_year() if yday is None else yday),
+        np.asarray(clouds, dtype=np.float64) / 100.0,
+        np.minimum(np.asarray(winds, dtype=np.float64) / 60.0, 1.0),
+        (np.asarray(temps, dtype=np.float64) - 15.0) / 30.0,
+        d >= 5,
+        (h >= 6.5) & (h <= 18.5),
+    )).astype(np.float32)
+
+
+def build_features(
+    hour: float,
+    weekday: int,       # 0=Mon … 6=Sun
+    month: int,
+    cloud_cover: float, # 0-100 %
+    wind_speed_kmh: float,
+    temperature: float = 28.0,
+) -> np.ndarray:
+    """
+    Return a 1-D feature vector for a single forecast hour.
+    Thin wrapper over build_features_batch – see it for the feature layout.
+    """
+    return build_features_batch(
+        [hour], [weekday], [month], [cloud_cover], [wind_speed_kmh], [temperature],
+    )[0]
 
 
 # ── Synthetic training data ───────────────────────────────────────────────────
 
-def _generate_training_data(n_samples: int = 4000) -> tuple[np.ndarray, np.ndarray]:
+def _generate_training_data(n_samples: int = 4000, seed: Optional[int] = None) -> tuple[np.ndarray, np.ndarray]:
     """
     Generate synthetic labelled examples that mirror real campus patterns.
     Targets: [solar_kw, wind_kw, load_kw]
+
+    All samples are drawn and labelled as whole-array NumPy operations
+    rather than one Python iteration per sample. Pass `seed` for a
+    reproducible batch.
     """
-    X, y = [], []
-    for _ in range(n_samples):
-        hour     = random.uniform(0, 24)
-        weekday  = random.randint(0, 6)
-        month    = random.randint(1, 12)
-        cloud    = random.uniform(0, 100)
-        wind_spd = random.uniform(5, 55)
-        temp     = random.uniform(18, 42)
-
-        # Physics-driven ground truth (same equations as simulator)
-        local_hour = (hour + 5.5) % 24
-        sun = _solar_angle(hour)
-        solar = SOLAR_CAP * sun * (1 - cloud / 100 * 0.85) + random.gauss(0, 1.5)
-        solar = max(0, min(SOLAR_CAP, solar))
-
-        wind_ratio = min(wind_spd / 45.0, 1.0)
-        wind = WIND_CAP * (wind_ratio ** 3) + random.gauss(0, 0.8)
-        wind = max(0, min(WIND_CAP, wind))
-
-        # Load profile (weekday vs weekend + hour)
-        if 0 <= local_hour < 6:
-            base_load = 12.0
-        elif 6 <= local_hour < 9:
-            base_load = 12 + (local_hour - 6) * 10
-        elif 9 <= local_hour < 18:
-            base_load = 42 + random.gauss(0, 4)
-        elif 18 <= local_hour < 22:
-            base_load = 40 - (local_hour - 18) * 5
-        else:
-            base_load = 16
-        # Weekend reduction
-        if weekday >= 5:
-            base_load *= 0.55
-        load = max(5, base_load + random.gauss(0, 2))
-
-        feats = build_features(hour, weekday, month, cloud, wind_spd, temp)
-        X.append(feats)
-        y.append([solar, wind, load])
-
-    return np.array(X), np.array(y)
+    rng      = np.random.default_rng(seed)
+    n        = n_samples
+    hour     = rng.uniform(0, 24, n)
+    weekday  = rng.integers(0, 7, n)
+    month    = rng.integers(1, 13, n)
+    cloud    = rng.uniform(0, 100, n)
+    wind_spd = rng.uniform(5, 55, n)
+    temp     = rng.uniform(18, 42, n)
+
+    # Physics-driven ground truth (same equations as simulator)
+    local_hour = (hour + 5.5) % 24
+    yday  = _day_of_year()
+    sun   = _solar_angle(hour, yday)
+    solar = SOLAR_CAP * sun * (1 - cloud / 100 * 0.85) + rng.normal(0, 1.5, n)
+    solar = np.clip(solar, 0, SOLAR_CAP)
+
+    wind_ratio = np.minimum(wind_spd / 45.0, 1.0)
+    wind = WIND_CAP * (wind_ratio ** 3) + rng.normal(0, 0.8, n)
+    wind = np.clip(wind, 0, WIND_CAP)
+
+    # Load profile (weekday vs weekend + hour)
+    base_load = np.select(
+        [local_hour < 6, local_hour < 9, local_hour < 18, local_hour < 22],
+        [
+            12.0,
+            12 + (local_hour - 6) * 10,
+            42 + rng.normal(0, 4, n),
+            40 - (local_hour - 18) * 5,
+        ],
+        default=16.0,
+    )
+    # Weekend reduction
+    base_load = np.where(weekday >= 5, base_load * 0.55, base_load)
+    load = np.maximum(5, base_load + rng.normal(0, 2, n))
+
+    X = build_features_batch(hour, weekday, month, cloud, wind_spd, temp, yday)
+    y = np.column_stack((solar, wind, load)).astype(np.float32)
+    return X, y
+
+
+def _make_model() -> HistGradientBoostingRegressor:
+    # Features and targets are kept float32 end to end; the booster bins
+    # them to uint8 internally. Early stopping is off so every fit builds
+    # the full 200 iterations and skips the validation-split copy.
+    return HistGradientBoostingRegressor(
+        max_iter=200,
+        max_depth=8,
+        learning_rate=0.05,
+        early_stopping=False,
+        random_state=42,
+    )
+
+
+def _retrain_worker(X_real: np.ndarray, y_real: np.ndarray) -> list[HistGradientBoostingRegressor]:
+    """Refit all target models in a worker process; returns the new models."""
+    # Combine with a fresh synthetic batch (5× real) for regularisation
+    Xs, ys = _generate_training_data(len(X_real) * 5)
+    X_all  = np.vstack([Xs, X_real]).astype(np.float32, copy=False)
+    y_all  = np.vstack([ys, y_real]).astype(np.float32, copy=False)
+    models = [_make_model() for _ in TARGETS]
+    for i, m in enumerate(models):
+        m.fit(X_all, y_all[:, i])
+    return models
 
 
 # ── Forecaster class ──────────────────────────────────────────────────────────
 
 class EnergyForecaster:
     """
-    Multi-output RandomForest predicting [solar_kw, wind_kw, load_kw]
-    for each forecast hour.
+    One HistGradientBoosting model per target predicting
+    [solar_kw, wind_kw, load_kw] for each forecast hour. Tree models are
+    scale-invariant, so features go in unscaled: add_actual() stores rows
+    in their final model-ready form and predict_24h() feeds the batch
+    builder's output straight to the models, with no transform pass on
+    either path.
 
     Fits on synthetic data at startup, retrains each time add_actual()
-    accumulates ≥ 500 real observations.
+    accumulates ≥ 500 real observations. Retraining runs in a background
+    process and the new models are swapped in when ready, so add_actual()
+    never blocks on a fit.
     """
 
-    RETRAIN_EVERY = 500   # real samples collected before retraining
+    RETRAIN_EVERY   = 500   # real samples collected before retraining
+    PRED_CACHE_SIZE = 4     # distinct weather inputs memoised by predict_24h (LRU)
 
     def __init__(self):
-        base = RandomForestRegressor(
-            n_estimators=120,
-            max_depth=10,
-            min_samples_leaf=4,
-            n_jobs=-1,
-            random_state=42,
-        )
-        self._model   = MultiOutputRegressor(base)
-        self._scaler  = StandardScaler()
+        self._models: list[HistGradientBoostingRegressor] = []
+        # Created on the first retrain, not here: forking (or spawning and
+        # re-importing) while the pretrain thread runs is best avoided.
+        self._retrain_executor: Optional[ProcessPoolExecutor] = None
+        self._retrain_future: Optional[Future] = None
         self._fitted  = False
-        self._actuals: list[tuple[np.ndarray, np.ndarray]] = []
+        self._alloc_actuals()
 
-        # Pre-train on synthetic data
-        X, y = _generate_training_data(4000)
+        # predict_24h memo – Open-Meteo only refreshes hourly, so dashboard
+        # polls mostly repeat the same 24-hour input.
+        self._pred_cache: OrderedDict[tuple, list] = OrderedDict()
+        self._cache_lock  = threading.Lock()
+
+        # Pre-train on synthetic data in the background so construction
+        # (and the first request that triggers it) never blocks on a fit.
+        self._ready = threading.Event()
+        threading.Thread(target=self._pretrain, name="forecaster-pretrain", daemon=True).start()
+
+    def _pretrain(self):
+        # Seeded so startup models are reproducible
+        X, y = _generate_training_data(4000, seed=42)
         self._fit(X, y)
+        self._ready.set()
+
+    def _alloc_actuals(self):
+        """Contiguous (SoA) buffers for real observations awaiting retrain."""
+        self._X_buf  = np.empty((self.RETRAIN_EVERY, 12), dtype=np.float32)
+        self._y_buf  = np.empty((self.RETRAIN_EVERY, len(TARGETS)), dtype=np.float32)
+        self._cursor = 0
 
     def _fit(self, X: np.ndarray, y: np.ndarray):
-        Xs = self._scaler.fit_transform(X)
-        self._model.fit(Xs, y)
+        # One target at a time: each fit already spreads over every core via
+        # OpenMP, so running them concurrently would only oversubscribe.
+        models = [_make_model() for _ in TARGETS]
+        for i, m in enumerate(models):
+            m.fit(X, y[:, i])
+        self._install(models)
+
+    def _install(self, models: list[HistGradientBoostingRegressor]):
+        self._models = models   # single rebind – readers see old or new, never a mix
         self._fitted = True
+        with self._cache_lock:
+            self._pred_cache.clear()
+
+    def _reset_retrain_executor(self):
+        """Drop a broken worker pool; the next retrain creates a fresh one."""
+        executor, self._retrain_executor = self._retrain_executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _start_retrain(self, X_real: np.ndarray, y_real: np.ndarray):
+        """Submit a background refit; on failure log it and keep the current models."""
+        try:
+            if self._retrain_executor is None:
+                # spawn, not fork: forking a process that runs asyncio, the
+                # pretrain thread and OpenMP pools can deadlock the child
+                self._retrain_executor = ProcessPoolExecutor(
+                    max_workers=1, mp_context=multiprocessing.get_context("spawn"),
+                )
+            self._retrain_future = self._retrain_executor.submit(_retrain_worker, X_real, y_real)
+        except Exception:
+            logger.exception("Forecaster retrain could not be started; keeping current models")
+            self._retrain_future = None
+            self._reset_retrain_executor()
+            return
+        self._retrain_future.add_done_callback(self._on_retrained)
+
+    def _on_retrained(self, fut: Future):
+        self._retrain_future = None
+        if fut.cancelled():
+            return
+        if fut.exception() is not None:
+            # keep serving the previous models
+            logger.error("Forecaster retrain failed; keeping current models", exc_info=fut.exception())
+            self._reset_retrain_executor()
+            return
+        self._install(fut.result())
+
+    def _predict(self, X: np.ndarray) -> np.ndarray:
+        """Predict all targets into one (N, n_targets) array, one column per model."""
+        out = np.empty((len(X), len(TARGETS)), dtype=np.float64)
+        for i, m in enumerate(self._models):
+            out[:, i] = m.predict(X)
+        return out
 
     def add_actual(self, reading: dict, hour: float, cloud: float, wind_kmh: float, temp: float):
         """
-        Accumulate a real observation. Triggers retraining every RETRAIN_EVERY samples.
+        Accumulate a real observation. Triggers a background retrain every
+        RETRAIN_EVERY samples. While a previous retrain is still running the
+        buffer stays full and further samples are dropped.
         """
-        now     = datetime.now(timezone.utc)
-        weekday = now.weekday()
-        month   = now.month
-        feats   = build_features(hour, weekday, month, cloud, wind_kmh, temp)
-        target  = np.array([
-            reading.get("solar_kw", 0),
-            reading.get("wind_kw", 0),
-            reading.get("load_kw", 0),
-        ])
-        self._actuals.append((feats, target))
-
-        if len(self._actuals) >= self.RETRAIN_EVERY:
-            Xr = np.array([a[0] for a in self._actuals])
-            yr = np.array([a[1] for a in self._actuals])
-            # Combine with a fresh synthetic batch (5× real) for regularisation
-            Xs, ys = _generate_training_data(len(self._actuals) * 5)
-            X_all  = np.vstack([Xs, Xr])
-            y_all  = np.vstack([ys, yr])
-            self._fit(X_all, y_all)
-            self._actuals = []   # reset buffer
+        if self._cursor < len(self._X_buf):
+            now     = datetime.now(timezone.utc)
+            weekday = now.weekday()
+            month   = now.month
+            self._X_buf[self._cursor] = build_features(hour, weekday, month, cloud, wind_kmh, temp)
+            self._y_buf[self._cursor] = (
+                reading.get("solar_kw", 0),
+                reading.get("wind_kw", 0),
+                reading.get("load_kw", 0),
+            )
+            self._cursor += 1
+
+        if self._cursor >= len(self._X_buf) and self._retrain_future is None:
+            # Hand the filled buffers to the worker and start fresh ones, so
+            # nothing is copied and the in-flight arrays are never overwritten.
+            Xr, yr = self._X_buf, self._y_buf
+            self._alloc_actuals()
+            self._start_retrain(Xr, yr)
 
     def predict_24h(
         self,
@@ -215,44 +342,72 @@ class EnergyForecaster:
         return a 24-element list of predicted generation + load.
 
         Each entry: { time, solar_kw, wind_kw, load_kw, total_gen_kw, surplus_kw }
+        Returns [] right away while the startup pretrain is still running.
         """
-        if not forecast_hours:
+        if not forecast_hours or not self._ready.is_set():
             return []
 
         now  = datetime.now(timezone.utc)
-        feats_list = []
-        for i, fh in enumerate(forecast_hours[:24]):
-            dt       = now + timedelta(hours=i)
-            hour     = (dt.hour + dt.minute / 60.0 + 5.5) % 24   # local time
-            weekday  = dt.weekday()
-            month    = dt.month
-            cloud    = fh.get("cloudcover", 0.0)
-            wind     = fh.get("windspeed_10m", 10.0)
-            temp     = fh.get("temperature_2m", 28.0)
-            feats_list.append(build_features(hour, weekday, month, cloud, wind, temp))
-
-        X      = np.array(feats_list)
-        Xs     = self._scaler.transform(X)
-        preds  = self._model.predict(Xs)   # shape (24, 3)
+        hours_in = forecast_hours[:24]
+
+        # Features depend on the wall-clock hour as well as the weather, so
+        # the current UTC hour is part of the key.
+        key = (now.strftime("%Y%m%d%H"), tuple(
+            (fh.get("time"), fh.get("cloudcover", 0), fh.get("windspeed_10m", 0), fh.get("temperature_2m", 0))
+            for fh in hours_in
+        ))
+        with self._cache_lock:
+            cached = self._pred_cache.get(key)
+            if cached is not None:
+                self._pred_cache.move_to_end(key)
+        if cached is not None:
+            # Copies, so a caller mutating its result can't corrupt later hits
+            return [dict(r) for r in cached]
+
+        n        = len(hours_in)
+        times    = [now + timedelta(hours=i) for i in range(n)]
+        rows = [
+            (
+                (dt.hour + dt.minute / 60.0 + 5.5) % 24,   # local time
+                dt.weekday(),
+                dt.month,
+                fh.get("cloudcover", 0.0),
+                fh.get("windspeed_10m", 10.0),
+                fh.get("temperature_2m", 28.0),
+            )
+            for dt, fh in zip(times, hours_in)
+        ]
+        cols = [np.fromiter((r[j] for r in rows), dtype=np.float64, count=n) for j in range(6)]
+
+        X      = build_features_batch(*cols)
+        preds  = self._predict(X)   # shape (24, 3)
+
+        # Clamp and round all rows at once: solar/wind ≥ 0, load ≥ 5 kW
+        preds   = np.round(np.maximum(preds, (0.0, 0.0, 5.0)), 2)
+        total   = np.round(preds[:, 0] + preds[:, 1], 2)
+        surplus = np.round(total - preds[:, 2], 2)
+        solar_l, wind_l, load_l = preds.T.tolist()
 
         results: List[Dict[str, Any]] = []
-        for i, (pred, fh) in enumerate(zip(preds, forecast_hours[:24])):
-            solar  = round(max(0, float(pred[0])), 2)
-            wind   = round(max(0, float(pred[1])), 2)
-            load   = round(max(5, float(pred[2])), 2)
-            total  = round(solar + wind, 2)
+        for solar, wind, load, tot, sur, fh in zip(solar_l, wind_l, load_l, total.tolist(), surplus.tolist(), hours_in):
             results.append({
                 "time":          fh.get("time", ""),
                 "solar_kw":      solar,
                 "wind_kw":       wind,
-                "total_gen_kw":  total,
+                "total_gen_kw":  tot,
                 "load_kw":       load,
-                "surplus_kw":    round(total - load, 2),
+                "surplus_kw":    sur,
                 "cloudcover":    fh.get("cloudcover", 0),
                 "windspeed_kmh": fh.get("windspeed_10m", 0),
                 "temperature":   fh.get("temperature_2m", 0),
             })
-        return results
+
+        with self._cache_lock:
+            self._pred_cache[key] = results
+            self._pred_cache.move_to_end(key)
+            if len(self._pred_cache) > self.PRED_CACHE_SIZE:
+                self._pred_cache.popitem(last=False)
+        return [dict(r) for r in results]
 
     def cumulative_surplus_kwh(self, forecast: List[dict], hours_ahead: int = 6) -> float:
         """Returns expected net surplus (kWh) over next N hours (positive = excess gen)."""
@@ -264,11 +419,11 @@ class EnergyForecaster:
             return {}
         best_sum = -1.0
         best_idx = 0
-        for i in range(len(forecast) - 1):
-            s = forecast[i]["solar_kw"] + forecast[i + 1]["solar_kw"]
-            if s > best_sum:
-                best_sum = s
-                best_idx = i
+        if len(forecast) > 1:
+            solar    = np.fromiter((r["solar_kw"] for r in forecast), dtype=np.float64, count=len(forecast))
+            sums     = solar[:-1] + solar[1:]   # every adjacent 2-hour pair
+            best_idx = int(sums.argmax())
+            best_sum = float(sums[best_idx])
         return {
             "start": forecast[best_idx]["time"],
             "end":   forecast[min(best_idx + 2, len(forecast) - 1)]["time"],
@@ -278,10 +433,13 @@ class EnergyForecaster:
 
 # ── Singleton ─────────────────────────────────────────────────────────────────
 _forecaster: Optional[EnergyForecaster] = None
+_forecaster_lock = threading.Lock()
 
 
 def get_forecaster() -> EnergyForecaster:
     global _forecaster
     if _forecaster is None:
-        _forecaster = EnergyForecaster()
+        with _forecaster_lock:
+            if _forecaster is None:
+                _forecaster = EnergyForecaster()
     return _forecaster
@@ -8,31 +8,40 @@ periodic aggregate snapshots used by the forecaster and optimizer.
 
 from __future__ import annotations
 
-import math
-import statistics
+import time
 from collections import deque
-from datetime   import datetime, timezone, timedelta
-from typing     import Deque, List, Dict, Any, Optional
-import threading
+from operator   import itemgetter
+from datetime   import datetime, timezone
+from typing     import Deque, List, Dict, NamedTuple, Optional
+
+import numpy as np
 
 
 # ── Config ────────────────────────────────────────────────────────────────────
 WINDOW_SIZE       = 720   # readings kept in memory  (720 × 5 s = 1 hour)
 ANOMALY_SIGMA     = 3.0   # readings > μ ± 3σ flagged as anomalous
 AGGREGATE_MINUTES = 5     # bin size for rolling aggregate timeline
+AGGREGATE_INTERVAL_NS = AGGREGATE_MINUTES * 60 * 10**9
 
+# Aggregate pyramid: (resolution, bins kept, bins merged into one of the
+# next tier). Bins evicted from a tier are averaged into the coarser one,
+# giving 1 h at 5 min, the day before at 1 h and the week before at 6 h.
+AGGREGATE_TIERS = (
+    ("5m", 12, 12),
+    ("1h", 24, 6),
+    ("6h", 28, None),
+)
+ANOMALY_FIELDS    = ("solar_kw", "wind_kw", "load_kw", "grid_import_kw")
 
-# ── Anomaly result ────────────────────────────────────────────────────────────
 
-class AnomalyFlag:
-    __slots__ = ("field", "value", "mean", "sigma", "severity")
+# ── Anomaly result ────────────────────────────────────────────────────────────
 
-    def __init__(self, field: str, value: float, mean: float, sigma: float):
-        self.field    = field
-        self.value    = value
-        self.mean     = mean
-        self.sigma    = sigma
-        self.severity = "HIGH" if abs(value - mean) > ANOMALY_SIGMA * 2 * sigma else "MEDIUM"
+class AnomalyFlag(NamedTuple):
+    field:    str
+    value:    float
+    mean:     float
+    sigma:    float
+    severity: str   # "HIGH" beyond 2 × ANOMALY_SIGMA σ, else "MEDIUM"
 
     def to_dict(self) -> dict:
         return {
@@ -48,7 +57,14 @@ class AnomalyFlag:
 
 class IngestionPipeline:
     """
-    Thread-safe rolling window over live sensor readings.
+    Rolling window over live sensor readings.
+
+    Single producer, many readers: `ingest` must only ever be called from
+    one thread (the simulator tick), while the query methods may be called
+    from any thread without locking. The producer writes a ring slot first
+    and then publishes (seq, head, filled) as a single tuple rebind, so a
+    reader sees either the old or the new state, never a mix.
+    When the ring is full the oldest reading is overwritten (drop-oldest).
 
     Usage
     ------
@@ -56,7 +72,8 @@ class IngestionPipeline:
     pipeline.ingest(reading_dict)          # called by simulator tick
     stats   = pipeline.rolling_stats()     # μ, σ, min/max per field
     history = pipeline.recent(n=60)        # last n readings
-    aggs    = pipeline.aggregates()        # 5-min bins for chart/ML
+    aggs    = pipeline.aggregates()        # last hour of 5-min bins
+    daily   = pipeline.aggregates(resolution="1h")   # last day, hourly
     """
 
     NUMERIC_FIELDS = [
@@ -66,12 +83,38 @@ class IngestionPipeline:
         "self_consumption_pct", "co2_saved_kg", "cost_saved_inr",
     ]
 
+    # Readings come from process_sensor_payload, which always fills every
+    # numeric field with a float, so values are picked without guards.
+    _pick_numeric = itemgetter(*NUMERIC_FIELDS)
+    _pick_anomaly = itemgetter(*ANOMALY_FIELDS)
+
     def __init__(self, window: int = WINDOW_SIZE):
-        self._lock:    threading.Lock = threading.Lock()
-        self._window   = deque(maxlen=window)          # raw readings
-        self._agg_buf: List[dict]     = []             # readings for current agg bin
-        self._aggs:    Deque[dict]    = deque(maxlen=288)  # 288 × 5-min = 24 h
-        self._agg_cutoff: Optional[datetime] = None
+        n_fields = len(self.NUMERIC_FIELDS)
+        self._ring: List[Optional[dict]] = [None] * window   # raw readings
+        self._aggs:  List[Deque[dict]] = [deque(maxlen=keep) for _, keep, _ in AGGREGATE_TIERS]
+        self._spill: List[List[dict]]  = [[] for _ in AGGREGATE_TIERS]  # evicted, awaiting merge
+        self._agg_views: Dict[str, tuple] = {name: () for name, _, _ in AGGREGATE_TIERS}
+        self._agg_cutoff_ns: Optional[int] = None   # monotonic clock
+
+        # Structure-of-arrays mirror of the ring: one float64 row per
+        # reading, so stats are NumPy reductions over columns. float64
+        # keeps large cumulative fields (co2, cost) exact to 3 decimals.
+        self._buf    = np.zeros((window, n_fields), dtype=np.float64)
+
+        # Running Σx and count for the current aggregate bin
+        self._agg_sums = np.zeros(n_fields, dtype=np.float64)
+        self._agg_n    = 0
+
+        # Published state: (seq, next slot to write, valid rows); seq
+        # counts every ingest ever made.
+        self._state: tuple = (0, 0, 0)
+
+        # Query results memoised per seq: (seq, {(query, n): result}).
+        # Data only changes once per tick while every client polls.
+        self._memo: tuple = (0, {})
+
+        # Columns checked by _detect_anomalies
+        self._anomaly_idx = np.array([self.NUMERIC_FIELDS.index(f) for f in ANOMALY_FIELDS])
 
     # ── Ingest ────────────────────────────────────────────────────────────────
 
@@ -79,36 +122,89 @@ class IngestionPipeline:
         """
         Add a new reading. Returns any anomaly flags detected.
         Automatically flushes the 5-minute aggregate bin when due.
+
+        `reading` must come from process_sensor_payload, which guarantees
+        every NUMERIC_FIELDS value is a float. A missing field raises
+        KeyError; a None/NaN or non-numeric one raises ValueError (or
+        TypeError). Nothing is stored when the reading is rejected.
         """
-        ts = datetime.now(timezone.utc)
+        now = time.monotonic_ns()
+        row = np.array(self._pick_numeric(reading), dtype=np.float64)
+        # None converts to NaN silently; one vectorised check catches both
+        if np.isnan(row).any():
+            raise ValueError("reading has None/NaN numeric fields; run it through process_sensor_payload")
+
+        self._push_row(reading, row)
 
-        with self._lock:
-            self._window.append(reading)
-            self._agg_buf.append(reading)
+        self._agg_sums += row
+        self._agg_n    += 1
 
-            # Initialise first aggregate cutoff
-            if self._agg_cutoff is None:
-                self._agg_cutoff = ts + timedelta(minutes=AGGREGATE_MINUTES)
+        # Initialise first aggregate cutoff
+        if self._agg_cutoff_ns is None:
+            self._agg_cutoff_ns = now + AGGREGATE_INTERVAL_NS
 
-            # Flush 5-min bin
-            if ts >= self._agg_cutoff:
-                self._flush_aggregate(self._agg_cutoff)
-                self._agg_buf = []
-                self._agg_cutoff = ts + timedelta(minutes=AGGREGATE_MINUTES)
+        # Flush 5-min bin; wall-clock time is only read when a bin is emitted
+        if now >= self._agg_cutoff_ns:
+            self._flush_aggregate(datetime.now(timezone.utc))
+            self._agg_cutoff_ns = now + AGGREGATE_INTERVAL_NS
 
-            anomalies = self._detect_anomalies(reading)
+        return self._detect_anomalies(reading)
 
-        return anomalies
+    def _push_row(self, reading: dict, row: np.ndarray):
+        """Write one reading into the ring, then publish the new state."""
+        seq, head, filled = self._state
+        self._buf[head]  = row
+        self._ring[head] = reading
+        self._state = (seq + 1, (head + 1) % len(self._buf), min(filled + 1, len(self._buf)))
+
+    def _mean_std(self, state: tuple, cols=slice(None)) -> tuple[int, np.ndarray, np.ndarray]:
+        """
+        (n, mean[], sample stdev[]) per field (or just `cols`) over the
+        window. Two-pass over the valid rows (NumPy's var subtracts the
+        mean first), so fields with a large offset and small spread lose
+        no precision.
+        """
+        n = state[2]
+        valid = self._buf[:n, cols]
+        if n == 0:
+            zeros = np.zeros(valid.shape[1])
+            return 0, zeros, zeros
+        mu = valid.mean(axis=0)
+        if n < 2:
+            return n, mu, np.zeros_like(mu)
+        return n, mu, valid.std(axis=0, ddof=1)
 
     def _flush_aggregate(self, bin_ts: datetime):
         """Compute mean of each numeric field over the current 5-min bin."""
-        if not self._agg_buf:
+        if not self._agg_n:
             return
+        means = self._agg_sums / self._agg_n
+        self._agg_sums.fill(0.0)
+        self._agg_n = 0
         agg: dict = {"timestamp": bin_ts.isoformat()}
-        for field in self.NUMERIC_FIELDS:
-            values = [r[field] for r in self._agg_buf if field in r and r[field] is not None]
-            agg[field] = round(statistics.mean(values), 3) if values else 0.0
-        self._aggs.append(agg)
+        agg.update(zip(self.NUMERIC_FIELDS, np.round(means, 3).tolist()))
+        self._push_aggregate(0, agg)
+
+    def _push_aggregate(self, level: int, agg: dict):
+        """Append a bin to a tier, cascading the evicted bin into the next one."""
+        name, keep, merge = AGGREGATE_TIERS[level]
+        bins = self._aggs[level]
+        if merge and len(bins) == keep:
+            spill = self._spill[level]
+            spill.append(bins[0])
+            if len(spill) == merge:
+                self._spill[level] = []
+                self._push_aggregate(level + 1, self._merge_bins(spill))
+        bins.append(agg)
+        # Publish a fresh mapping so readers never see a half-updated tier
+        self._agg_views = {**self._agg_views, name: tuple(bins)}
+
+    def _merge_bins(self, bins: List[dict]) -> dict:
+        """One coarser bin: field means over `bins`, stamped with the last one's end."""
+        means = np.array([[b[f] for f in self.NUMERIC_FIELDS] for b in bins]).mean(axis=0)
+        merged: dict = {"timestamp": bins[-1]["timestamp"]}
+        merged.update(zip(self.NUMERIC_FIELDS, np.round(means, 3).tolist()))
+        return merged
 
     def _detect_anomalies(self, reading: dict) -> List[AnomalyFlag]:
         """
@@ -116,60 +212,110 @@ class IngestionPipeline:
         deviations from its rolling mean (requires ≥ 30 readings).
         """
         flags: List[AnomalyFlag] = []
-        if len(self._window) < 30:
+        if self._state[2] < 30:
             return flags
+        n, mu, sigma = self._mean_std(self._state, self._anomaly_idx)
 
-        for field in ("solar_kw", "wind_kw", "load_kw", "grid_import_kw"):
-            values = [r[field] for r in self._window if field in r]
-            if len(values) < 10:
-                continue
-            mu    = statistics.mean(values)
-            sigma = statistics.stdev(values) if len(values) > 1 else 0.0
-            if sigma < 0.1:
-                continue          # flat signal – skip
-            val = reading.get(field, 0.0)
-            if abs(val - mu) > ANOMALY_SIGMA * sigma:
-                flags.append(AnomalyFlag(field, val, mu, sigma))
+        # Test all watched fields at once; flat signals (σ < 0.1) are skipped
+        vals = np.array(self._pick_anomaly(reading), dtype=np.float64)
+        dev  = np.abs(vals - mu)
+        hits = (sigma >= 0.1) & (dev > ANOMALY_SIGMA * sigma)
+        high = dev > ANOMALY_SIGMA * 2 * sigma
+
+        for j in np.flatnonzero(hits).tolist():
+            flags.append(AnomalyFlag(
+                ANOMALY_FIELDS[j], vals[j].item(), mu[j].item(), sigma[j].item(),
+                "HIGH" if high[j] else "MEDIUM",
+            ))
 
         return flags
 
     # ── Queries ───────────────────────────────────────────────────────────────
 
+    def _cached(self, key: tuple, compute):
+        """
+        Return compute() memoised for the current seq. Results are shared
+        between callers and must be treated as read-only.
+        """
+        seq = self._state[0]
+        memo_seq, memo = self._memo
+        if memo_seq != seq:
+            memo = {}
+            self._memo = (seq, memo)
+        try:
+            return memo[key]
+        except KeyError:
+            result = memo[key] = compute()
+            return result
+
     def recent(self, n: int = 60) -> List[dict]:
         """Return the last n raw readings (chronological order)."""
-        with self._lock:
-            items = list(self._window)
-        return items[-n:]
-
-    def aggregates(self, n: int = 288) -> List[dict]:
-        """Return up to n 5-minute aggregate bins (chronological)."""
-        with self._lock:
-            items = list(self._aggs)
-        return items[-n:]
+        ring = self._ring
+        while True:
+            seq, head, filled = self._state[:3]
+            k = min(max(n, 0), filled)
+            start = head - k
+            if start >= 0:
+                items = ring[start:head]
+            else:
+                items = ring[start:] + ring[:head]
+            # The producer only reaches our oldest slot after len(ring) - k
+            # more writes; retry in the unlikely case it lapped the copy.
+            if self._state[0] - seq <= len(ring) - k:
+                return items
+
+    def aggregates(self, n: Optional[int] = None, resolution: str = "5m") -> List[dict]:
+        """
+        Return the latest n aggregate bins of one tier, chronologically.
+        Tiers hold a fixed number of bins (see AGGREGATE_TIERS: 12 × 5m,
+        24 × 1h, 28 × 6h); n=None returns the whole tier, and a larger n
+        is capped at it – ask a coarser resolution for a longer span.
+        """
+        try:
+            view = self._agg_views[resolution]
+        except KeyError:
+            raise ValueError(f"unknown resolution {resolution!r}; "
+                             f"expected one of {list(self._agg_views)}") from None
+        if n is None:
+            return list(view)
+        return list(view[-n:]) if n > 0 else []
 
     def rolling_stats(self) -> Dict[str, Dict[str, float]]:
         """
         Return rolling statistics (mean, std, min, max, current) for
         every numeric field across the current window.
         """
-        with self._lock:
-            snap = list(self._window)
+        return self._cached(("rolling_stats",), self._rolling_stats)
+
+    def _rolling_stats(self) -> Dict[str, Dict[str, float]]:
+        state = self._state
+        n, mu, std = self._mean_std(state)
+        if n == 0:
+            return {field: {} for field in self.NUMERIC_FIELDS}
+        # Row order is irrelevant for min/max, so reduce the valid rows in
+        # place; a row written concurrently can at worst widen the range
+        # by the very latest reading.
+        valid   = self._buf[:n]
+        mins    = valid.min(axis=0)
+        maxs    = valid.max(axis=0)
+        current = self._buf[(state[1] - 1) % len(self._buf)].copy()
+
+        # Python's round() (correctly rounded) rather than np.round, whose
+        # scale-and-round can land a tie on the other side for large values
+        table = [
+            [round(x, 3) for x in row]
+            for row in np.stack([mu, std, mins, maxs, current], axis=1).tolist()
+        ]
 
         stats: Dict[str, Dict[str, float]] = {}
-        for field in self.NUMERIC_FIELDS:
-            values = [r[field] for r in snap if field in r and r[field] is not None]
-            if not values:
-                stats[field] = {}
-                continue
-            mu  = statistics.mean(values)
-            std = statistics.stdev(values) if len(values) > 1 else 0.0
+        for field, (m, s, lo, hi, cur) in zip(self.NUMERIC_FIELDS, table):
             stats[field] = {
-                "mean":    round(mu, 3),
-                "std":     round(std, 3),
-                "min":     round(min(values), 3),
-                "max":     round(max(values), 3),
-                "current": round(values[-1], 3),
-                "n":       len(values),
+                "mean":    m,
+                "std":     s,
+                "min":     lo,
+                "max":     hi,
+                "current": cur,
+                "n":       n,
             }
         return stats
 
@@ -178,22 +324,25 @@ class IngestionPipeline:
         Return a compact series suitable for the live chart:
         [{ time, solar_kw, wind_kw, load_kw, grid_import_kw, battery_soc_pct }]
         """
+        return self._cached(("power_balance", n), lambda: self._power_balance_series(n))
+
+    def _power_balance_series(self, n: int) -> List[dict]:
         raw = self.recent(n)
         return [
             {
                 "timestamp":       r.get("timestamp", ""),
-                "solar_kw":        r.get("solar_kw", 0),
-                "wind_kw":         r.get("wind_kw", 0),
-                "load_kw":         r.get("load_kw", 0),
-                "grid_import_kw":  r.get("grid_import_kw", 0),
-                "battery_soc_pct": r.get("battery_soc_pct", 0),
-                "self_consumption_pct": r.get("self_consumption_pct", 0),
+                "solar_kw":        r["solar_kw"],
+                "wind_kw":         r["wind_kw"],
+                "load_kw":         r["load_kw"],
+                "grid_import_kw":  r["grid_import_kw"],
+                "battery_soc_pct": r["battery_soc_pct"],
+                "self_consumption_pct": r["self_consumption_pct"],
             }
             for r in raw
         ]
 
     def __len__(self) -> int:
-        return len(self._window)
+        return self._state[2]
 
 
 # ── Singleton ─────────────────────────────────────────────────────────────────
@@ -5,13 +5,16 @@ Free API — no API key required.
 """
 
 import httpx
+import numpy as np
+import orjson
 from datetime import datetime, timezone, timedelta
-import math
-import random
+import time
 from typing import Optional
 import os
 from dotenv import load_dotenv
 
+from load_profile import load_profile_vec
+
 load_dotenv()
 
 LATITUDE  = float(os.getenv("LATITUDE",  26.9124))
@@ -19,33 +22,43 @@ LONGITUDE = float(os.getenv("LONGITUDE", 75.7873))
 
 OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
 
-def _load_profile_kw(hour: float) -> float:
-    """
-    Typical government campus demand profile:
-    - Low 00:00–06:00 (hostel, minimal lighting)
-    - Morning ramp 06:00–09:00
-    - Peak 09:00–18:00 (labs, HVAC, offices)
-    - Evening dip 18:00–22:00
-    - Baseline night
-    """
-    local_hour = (hour + 5.5) % 24
-    # Build a piecewise profile
-    if 0 <= local_hour < 6:
-        base = 15.0
-    elif 6 <= local_hour < 9:
-        base = 15.0 + (local_hour - 6) * 10.0  # ramp up
-    elif 9 <= local_hour < 13:
-        base = 45.0 + (local_hour - 9) * 3.0   # peak build
-    elif 13 <= local_hour < 14:
-        base = 57.0 - (local_hour - 13) * 5.0  # lunch dip
-    elif 14 <= local_hour < 18:
-        base = 52.0 + (local_hour - 14) * 1.5  # afternoon
-    elif 18 <= local_hour < 22:
-        base = 40.0 - (local_hour - 18) * 5.0  # evening wind-down
-    else:
-        base = 18.0
-    noise = random.gauss(0, 2.5)
-    return max(5.0, base + noise)
+# Open-Meteo only updates hourly, so results are reused for a few minutes
+# and one pooled client keeps the connection to it alive between fetches.
+FORECAST_TTL_S = 600
+_forecast_cache: dict[tuple, tuple[float, dict]] = {}
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(timeout=10.0)
+    return _client
+
+
+async def close_forecast_client():
+    """Close the shared Open-Meteo client (called on app shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def _utc_hour(local_time: str) -> float:
+    """UTC hour of day for an IST ISO timestamp from Open-Meteo."""
+    try:
+        return (datetime.fromisoformat(local_time).hour - 5.5) % 24
+    except Exception:
+        return 0
+
+
+def _utc_hours(local_times: list) -> np.ndarray:
+    """_utc_hour over a whole series, parsed in one datetime64 conversion."""
+    try:
+        hours = np.asarray(local_times, dtype="datetime64[h]").astype(np.int64) % 24
+    except (ValueError, TypeError):
+        # Malformed entries: fall back to the per-item parser
+        return np.array([_utc_hour(t) for t in local_times], dtype=float)
+    return (hours - 5.5) % 24
 
 
 async def fetch_solar_wind_forecast(hours_ahead: int = 24) -> dict:
@@ -62,7 +75,14 @@ async def fetch_solar_wind_forecast(hours_ahead: int = 24) -> dict:
         "forecast_solar_kw"        : list[float] estimated kW from campus panels
         "forecast_wind_kw"         : list[float] estimated kW from campus turbine
         "forecast_surplus_kwh_3h"  : float       expected surplus/deficit next 3 hrs
+
+    Results are cached per (location, hours_ahead) for FORECAST_TTL_S.
     """
+    key = (LATITUDE, LONGITUDE, hours_ahead)
+    cached = _forecast_cache.get(key)
+    if cached is not None and time.monotonic() - cached[0] < FORECAST_TTL_S:
+        return cached[1]
+
     params = {
         "latitude":  LATITUDE,
         "longitude": LONGITUDE,
@@ -76,10 +96,9 @@ async def fetch_solar_wind_forecast(hours_ahead: int = 24) -> dict:
         "timezone": "Asia/Kolkata",
     }
 
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        response = await client.get(OPEN_METEO_URL, params=params)
-        response.raise_for_status()
-        data = response.json()
+    response = await _get_client().get(OPEN_METEO_URL, params=params)
+    response.raise_for_status()
+    data = orjson.loads(response.content)
 
     hourly = data.get("hourly", {})
     times         = hourly.get("time", [])
@@ -95,32 +114,27 @@ async def fetch_solar_wind_forecast(hours_ahead: int = 24) -> dict:
     WIND_CAP_KW            = float(os.getenv("WIND_CAPACITY_KW", 15.0))
     WIND_RATED_SPEED_KMH   = 45.0     # turbine rated wind speed
 
-    forecast_solar_kw = []
-    forecast_wind_kw  = []
-    forecast_load_kw  = []
-
-    for idx, (rad, ws, cc) in enumerate(zip(radiation, windspeed, cloudcover)):
-        # Calculate local hour of day for load forecasting
-        try:
-            time_obj = datetime.fromisoformat(times[idx])
-            # times[idx] is local time. _load_profile_kw expects UTC hour.
-            hr_utc = (time_obj.hour - 5.5) % 24
-        except Exception:
-            hr_utc = 0
-            
-        load_kw = round(_load_profile_kw(hr_utc), 2)
-        forecast_load_kw.append(load_kw)
-
-        # Solar: irradiance → kW, capped at installed capacity
-        solar_raw = (rad / 1000.0) * SOLAR_PANEL_AREA_M2 * SOLAR_EFFICIENCY
-        solar_kw  = round(min(solar_raw * (1 - cc / 100 * 0.8), SOLAR_CAP_KW), 2)
-
-        # Wind: cubic power curve (simplified)
-        wind_ratio = min(ws / WIND_RATED_SPEED_KMH, 1.0)
-        wind_kw    = round(WIND_CAP_KW * (wind_ratio ** 3), 2)
-
-        forecast_solar_kw.append(solar_kw)
-        forecast_wind_kw.append(wind_kw)
+    # Whole-series conversion, one array expression per quantity
+    n   = min(len(radiation), len(windspeed), len(cloudcover))
+    rad = np.asarray(radiation[:n], dtype=float)
+    ws  = np.asarray(windspeed[:n], dtype=float)
+    cc  = np.asarray(cloudcover[:n], dtype=float)
+
+    # times are local; the load profile expects UTC hours
+    hr_utc  = _utc_hours(times[:n])
+    load_kw = np.round(load_profile_vec(hr_utc), 2)
+
+    # Solar: irradiance → kW, capped at installed capacity
+    solar_raw = (rad / 1000.0) * SOLAR_PANEL_AREA_M2 * SOLAR_EFFICIENCY
+    solar_kw  = np.round(np.minimum(solar_raw * (1 - cc / 100 * 0.8), SOLAR_CAP_KW), 2)
+
+    # Wind: cubic power curve (simplified)
+    wind_ratio = np.minimum(ws / WIND_RATED_SPEED_KMH, 1.0)
+    wind_kw    = np.round(WIND_CAP_KW * (wind_ratio ** 3), 2)
+
+    forecast_solar_kw = solar_kw.tolist()
+    forecast_wind_kw  = wind_kw.tolist()
+    forecast_load_kw  = load_kw.tolist()
 
     # Find index for "now" to calculate next-3h surplus
     now_local = datetime.now(timezone.utc) + timedelta(hours=5.5)
@@ -128,14 +142,13 @@ async def fetch_solar_wind_forecast(hours_ahead: int = 24) -> dict:
     surplus_kwh_3h: float  = 0.0
     try:
         idx = next(i for i, t in enumerate(times) if t >= now_str[:13])
-        for j in range(idx, min(idx + 3, len(times))):
-            gen  = forecast_solar_kw[j] + forecast_wind_kw[j]
-            load = forecast_load_kw[j]
-            surplus_kwh_3h += max(0.0, gen - load) * 1.0   # 1 hour each
+        window = slice(idx, min(idx + 3, len(times)))
+        gen = solar_kw[window] + wind_kw[window]
+        surplus_kwh_3h = float(np.maximum(0.0, gen - load_kw[window]).sum())   # 1 hour each
     except StopIteration:
         surplus_kwh_3h = 0.0
 
-    return {
+    result = {
         "hourly_time":            times[:hours_ahead],
         "shortwave_radiation":    radiation[:hours_ahead],
         "windspeed_10m":          windspeed[:hours_ahead],
@@ -151,6 +164,8 @@ async def fetch_solar_wind_forecast(hours_ahead: int = 24) -> dict:
             "city": os.getenv("CITY_NAME", "Jaipur"),
         },
     }
+    _forecast_cache[key] = (time.monotonic(), result)
+    return result
 
 
 async def get_current_cloudcover() -> float:
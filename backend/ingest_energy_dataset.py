@@ -1,13 +1,56 @@
-import csv
+import asyncio
 import httpx
-import time
-from datetime import datetime, timedelta, timezone
+import numpy as np
+import pandas as pd
+from datetime import datetime, timezone
 import os
 
 CSV_FILE = r"c:\Users\vijay\OneDrive\Desktop\hack\energy_dataset_.csv"
 API_URL = "http://127.0.0.1:8000/api/v1/ingest"
 
-def process_and_ingest():
+# Columns used from the dataset and the value assumed when one is absent
+COLUMN_DEFAULTS = {
+    'Energy_Production_MWh': 0,
+    'Energy_Consumption_MWh': 0,
+    'Type_of_Renewable_Energy': 1,
+}
+
+# Parsed rows that may wait for the poster before the producer is held back.
+# There is a single poster: the backend advances battery SOC in arrival
+# order, so rows must reach it one at a time and in sequence.
+QUEUE_SIZE = 64
+
+async def push_row(client, idx, payload):
+    try:
+        response = await client.post(API_URL, json=payload, timeout=5.0)
+
+        if response.status_code == 200:
+            res_data = response.json()
+            active_strat = res_data['reading'].get('active_strategy', 'UNKNOWN')
+            print(f"[Row {idx}] Solar: {payload['solar_kw']:05.1f}kW | Wind: {payload['wind_kw']:05.0f}kW | Load: {payload['load_kw']:05.1f}kW | Strat: {active_strat}")
+        else:
+            print(f"Failed to push data: {response.text}")
+    except Exception as e:
+        print(f"Failed to push row {idx}: {e}")
+
+async def post_worker(client, queue):
+    """Consumer: post queued rows in order until the None sentinel arrives."""
+    while (item := await queue.get()) is not None:
+        await push_row(client, *item)
+        # Pause between posts so the UI updates visibly
+        await asyncio.sleep(1.0)
+
+async def post_rows(rows):
+    """Producer: feed (label, payload) rows through a bounded queue to one keep-alive poster."""
+    queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    async with httpx.AsyncClient() as client:
+        worker = asyncio.create_task(post_worker(client, queue))
+        for row in rows:
+            await queue.put(row)   # blocks while the queue is full (back-pressure)
+        await queue.put(None)
+        await worker
+
+async def process_and_ingest():
     print(f"Opening {CSV_FILE}...")
     
     if not os.path.exists(CSV_FILE):
@@ -16,60 +59,52 @@ def process_and_ingest():
 
     current_time = datetime.now(timezone.utc)
     
-    with open(CSV_FILE, mode='r', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
-        
-        for idx, row in enumerate(reader):
-            try:
-                # 1. Generate Synthetic Timestamp
-                timestamp_str = current_time.isoformat()
-                
-                # 2. Extract and scale values 
-                # The dataset uses MWh which are massive numbers. We divide by 1000 
-                # to fit them on a 0-500 kW campus UI scale.
-                production_mwh = float(row.get('Energy_Production_MWh', 0))
-                consumption_mwh = float(row.get('Energy_Consumption_MWh', 0))
-                ren_type = int(row.get('Type_of_Renewable_Energy', 1))
-                
-                base_gen = production_mwh / 1000.0
-                
-                # Arbitrary split based on generic renewable types
-                if ren_type % 2 == 0:
-                    solar_kw = base_gen * 0.8
-                    wind_kw = base_gen * 0.2
-                else:
-                    solar_kw = base_gen * 0.3
-                    wind_kw = base_gen * 0.7
-                
-                load_kw = consumption_mwh / 1000.0
-                
-                # 5. Build Payload
-                payload = {
-                    "timestamp_utc": timestamp_str.replace("+00:00", "Z"),
-                    "solar_kw": round(solar_kw, 2),
-                    "wind_kw": round(wind_kw, 2),
-                    "load_kw": round(load_kw, 2),
-                    "battery_soc_pct": 50.0 # Overridden by backend engine dynamically
-                }
-                
-                # 6. Push to GridZen API
-                response = httpx.post(API_URL, json=payload, timeout=5.0)
-                
-                if response.status_code == 200:
-                    res_data = response.json()
-                    active_strat = res_data['reading'].get('active_strategy', 'UNKNOWN')
-                    print(f"[Row {idx}] Solar: {solar_kw:05.1f}kW | Wind: {wind_kw:05.0f}kW | Load: {load_kw:05.1f}kW | Strat: {active_strat}")
-                else:
-                    print(f"Failed to push data: {response.text}")
-
-                # Advance time by 5 minutes for the next row
-                current_time += timedelta(minutes=5)
-                
-                # Pause for 1 second between rows so the UI updates visibly
-                time.sleep(1.0)
-                
-            except Exception as e:
-                print(f"Failed to process row {idx}: {e}")
+    df = pd.read_csv(CSV_FILE, usecols=lambda col: col in COLUMN_DEFAULTS, encoding='utf-8')
+    for col, default in COLUMN_DEFAULTS.items():
+        if col not in df:
+            df[col] = default
+    
+    # Rows with unparsable values are skipped
+    df = df.apply(pd.to_numeric, errors='coerce')
+    bad = df.isna().any(axis=1)
+    for idx in df.index[bad]:
+        print(f"Failed to process row {idx}: unparsable value")
+    df = df[~bad]
+    
+    # 1. Generate Synthetic Timestamps, 5 minutes apart
+    timestamps = pd.date_range(start=current_time, periods=len(df), freq='5min')
+    
+    # 2. Extract and scale values 
+    # The dataset uses MWh which are massive numbers. We divide by 1000 
+    # to fit them on a 0-500 kW campus UI scale.
+    base_gen = df['Energy_Production_MWh'].to_numpy(dtype=float) / 1000.0
+    load_kw = df['Energy_Consumption_MWh'].to_numpy(dtype=float) / 1000.0
+    ren_type = df['Type_of_Renewable_Energy'].to_numpy().astype(int)
+    
+    # Arbitrary split based on generic renewable types
+    even = ren_type % 2 == 0
+    solar_kw = base_gen * np.where(even, 0.8, 0.3)
+    wind_kw = base_gen * np.where(even, 0.2, 0.7)
+    
+    # 5. Build Payloads lazily, as the queue drains
+    payloads = (
+        {
+            "timestamp_utc": ts.isoformat().replace("+00:00", "Z"),
+            "solar_kw": s,
+            "wind_kw": w,
+            "load_kw": l,
+            "battery_soc_pct": 50.0 # Overridden by backend engine dynamically
+        }
+        for ts, s, w, l in zip(
+            timestamps,
+            np.round(solar_kw, 2).tolist(),
+            np.round(wind_kw, 2).tolist(),
+            np.round(load_kw, 2).tolist(),
+        )
+    )
+    
+    # 6. Push to GridZen API
+    await post_rows(zip(df.index.tolist(), payloads))
 
 if __name__ == "__main__":
-    process_and_ingest()
+    asyncio.run(process_and_ingest())
@@ -1,7 +1,9 @@
-import csv
+import asyncio
 import httpx
-import time
-from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from load_profile import load_profile_vec
 
 # Point this to your new local CSV file
 CSV_FILE = "nsrdb_mock_dataset.csv"
@@ -14,85 +16,105 @@ SOLAR_CAP_KW = 50.0
 WIND_CAP_KW = 15.0
 WIND_RATED_SPEED_MS = 12.5  # ~45 km/h rated wind speed
 
-def get_campus_load(hour: float) -> float:
-    """Generates an estimated kW load based on the time of day."""
-    local_hour = (hour + 5.5) % 24
-    if 0 <= local_hour < 6: return 15.0
-    elif 6 <= local_hour < 9: return 15.0 + (local_hour - 6) * 10.0
-    elif 9 <= local_hour < 13: return 45.0 + (local_hour - 9) * 3.0
-    elif 13 <= local_hour < 14: return 57.0 - (local_hour - 13) * 5.0
-    elif 14 <= local_hour < 18: return 52.0 + (local_hour - 14) * 1.5
-    elif 18 <= local_hour < 22: return 40.0 - (local_hour - 18) * 5.0
-    else: return 18.0
+# Parsed rows that may wait for the poster before the producer is held back.
+# There is a single poster: the backend advances battery SOC in arrival
+# order, so rows must reach it one at a time and in sequence.
+QUEUE_SIZE = 64
 
-def process_and_ingest():
-    print(f"Opening {CSV_FILE}...")
-    
-    with open(CSV_FILE, mode='r', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
+async def push_row(client, timestamp_str, payload):
+    try:
+        response = await client.post(API_URL, json=payload, timeout=5.0)
+        res_data = response.json()
         
-        # The exact headers in this CSV have encoding artifacts (e.g. GHI (W/mA))
-        # So we identify columns by substring rather than exact match
-        time_col = next((col for col in reader.fieldnames if "Timestamp" in col), "Timestamp")
-        ghi_col = next((col for col in reader.fieldnames if "GHI" in col and "NextHour" not in col), None)
-        wind_col = next((col for col in reader.fieldnames if "Wind Speed" in col), None)
+        active_strat = res_data['reading'].get('active_strategy', 'UNKNOWN')
         
-        if not ghi_col:
-            print("Error: Could not find a GHI column in the dataset.")
-            return
+        print(f"[{timestamp_str}] Solar: {payload['solar_kw']:05.1f}kW | Load: {payload['load_kw']:05.1f}kW | Strat: {active_strat}")
+    except Exception as e:
+        print(f"Failed to push row {timestamp_str}: {e}")
+
+async def post_worker(client, queue):
+    """Consumer: post queued rows in order until the None sentinel arrives."""
+    while (item := await queue.get()) is not None:
+        await push_row(client, *item)
+        # Pause between posts so you can watch clearly on the dashboard
+        await asyncio.sleep(1.0)
+
+async def post_rows(rows):
+    """Producer: feed (label, payload) rows through a bounded queue to one keep-alive poster."""
+    queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    async with httpx.AsyncClient() as client:
+        worker = asyncio.create_task(post_worker(client, queue))
+        for row in rows:
+            await queue.put(row)   # blocks while the queue is full (back-pressure)
+        await queue.put(None)
+        await worker
+
+def parse_timestamps(raw: pd.Series) -> pd.Series:
+    """Parse "M/D/YYYY H:MM" timestamps; unparsable entries become NaT."""
+    dt = pd.to_datetime(raw, format="%m/%d/%Y %H:%M", errors="coerce")
+    missing = dt.isna()
+    if missing.any():
+        # Fallback in case some lines have seconds
+        dt[missing] = pd.to_datetime(raw[missing], format="%m/%d/%Y %H:%M:%S", errors="coerce")
+    return dt
+
+async def process_and_ingest():
+    print(f"Opening {CSV_FILE}...")
+    
+    df = pd.read_csv(CSV_FILE, dtype=str, encoding='utf-8')
+    
+    # The exact headers in this CSV have encoding artifacts (e.g. GHI (W/mA))
+    # So we identify columns by substring rather than exact match
+    time_col = next((col for col in df.columns if "Timestamp" in col), "Timestamp")
+    ghi_col = next((col for col in df.columns if "GHI" in col and "NextHour" not in col), None)
+    wind_col = next((col for col in df.columns if "Wind Speed" in col), None)
+    
+    if not ghi_col:
+        print("Error: Could not find a GHI column in the dataset.")
+        return
 
-        for row in reader:
-            try:
-                # 1. Parse Time
-                timestamp_str = row[time_col]
-                # Format is "1/1/1998 0:30" or "M/D/YYYY H:MM" (no leading zeros)
-                try:
-                    dt = datetime.strptime(timestamp_str, "%m/%d/%Y %H:%M")
-                except ValueError:
-                    # Fallback in case some lines have seconds
-                    dt = datetime.strptime(timestamp_str, "%m/%d/%Y %H:%M:%S")
-                
-                hour_utc = dt.hour + dt.minute / 60.0
-                
-                # 2. Convert GHI Irradiance to Solar kW
-                ghi = float(row[ghi_col])
-                solar_raw = (ghi / 1000.0) * SOLAR_PANEL_AREA_M2 * SOLAR_EFFICIENCY
-                solar_kw = round(min(solar_raw, SOLAR_CAP_KW), 2)
-                
-                # 3. Convert Wind Speed to Wind kW
-                wind_kw = 0.0
-                if wind_col:
-                    wind_speed = float(row[wind_col])
-                    wind_ratio = min(wind_speed / WIND_RATED_SPEED_MS, 1.0)
-                    wind_kw = round(WIND_CAP_KW * (wind_ratio ** 3), 2)
-                
-                # 4. Generate Load Profile
-                load_kw = round(get_campus_load(hour_utc), 2)
-                
-                # 5. Build Payload
-                payload = {
-                    "timestamp_utc": dt.isoformat() + "Z", # UTC ISO string
-                    "solar_kw": solar_kw,
-                    "wind_kw": wind_kw,
-                    "load_kw": load_kw,
-                    "battery_soc_pct": 50.0 # Will be overridden by the optimization engine
-                }
-                
-                # 6. Push to GridZen API
-                response = httpx.post(API_URL, json=payload, timeout=5.0)
-                res_data = response.json()
-                
-                active_strat = res_data['reading'].get('active_strategy', 'UNKNOWN')
-                grid_export = res_data['reading'].get('grid_export_kw', 0)
-                grid_import = res_data['reading'].get('grid_import_kw', 0)
-                
-                print(f"[{timestamp_str}] Solar: {solar_kw:05.1f}kW | Load: {load_kw:05.1f}kW | Strat: {active_strat}")
-                
-                # Pause for 1 second between rows so you can watch clearly on the dashboard
-                time.sleep(1.0)
-                
-            except Exception as e:
-                print(f"Failed to process row {row.get(time_col, 'unknown time')}: {e}")
+    # 1. Parse whole columns at once; rows with unparsable values are skipped
+    # Format is "1/1/1998 0:30" or "M/D/YYYY H:MM" (no leading zeros)
+    dt = parse_timestamps(df[time_col])
+    ghi = pd.to_numeric(df[ghi_col], errors="coerce")
+    wind_speed = pd.to_numeric(df[wind_col], errors="coerce") if wind_col else pd.Series(0.0, index=df.index)
+    
+    valid = dt.notna() & ghi.notna() & wind_speed.notna()
+    for timestamp_str in df.loc[~valid, time_col]:
+        print(f"Failed to process row {timestamp_str}: unparsable value")
+    
+    raw_ts = df.loc[valid, time_col].tolist()
+    dt = dt[valid]
+    hour_utc = (dt.dt.hour + dt.dt.minute / 60.0).to_numpy()
+    
+    # 2. Convert GHI Irradiance to Solar kW
+    solar_raw = (ghi[valid].to_numpy() / 1000.0) * SOLAR_PANEL_AREA_M2 * SOLAR_EFFICIENCY
+    solar_kw = np.round(np.minimum(solar_raw, SOLAR_CAP_KW), 2)
+    
+    # 3. Convert Wind Speed to Wind kW
+    wind_ratio = np.minimum(wind_speed[valid].to_numpy() / WIND_RATED_SPEED_MS, 1.0)
+    wind_kw = np.round(WIND_CAP_KW * (wind_ratio ** 3), 2)
+    
+    # 4. Generate Load Profile
+    load_kw = np.round(load_profile_vec(hour_utc, noisy=False), 2)
+    
+    # 5. Build Payloads lazily, as the queue drains
+    payloads = (
+        {
+            "timestamp_utc": ts, # UTC ISO string
+            "solar_kw": s,
+            "wind_kw": w,
+            "load_kw": l,
+            "battery_soc_pct": 50.0 # Will be overridden by the optimization engine
+        }
+        for ts, s, w, l in zip(
+            dt.dt.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            solar_kw.tolist(), wind_kw.tolist(), load_kw.tolist(),
+        )
+    )
+    
+    # 6. Push to GridZen API
+    await post_rows(zip(raw_ts, payloads))
 
 if __name__ == "__main__":
-    process_and_ingest()
+    asyncio.run(process_and_ingest())
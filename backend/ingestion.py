@@ -3,53 +3,78 @@ GridZen - Data Ingestion Pipeline
 Handles formatting, validation, and database preparation of incoming sensor payloads.
 """
 from datetime import datetime
-import json
-from typing import Optional
+from typing import NotRequired, Optional, TypedDict
 
-def process_sensor_payload(raw_payload: dict, timestamp: Optional[datetime] = None) -> dict:
+import orjson
+
+
+class SensorReading(TypedDict):
+    """
+    Shape of a processed reading: every key is always present and every
+    numeric field is a float; only the strategy label may be absent.
+    """
+    timestamp_utc: Optional[datetime]
+    solar_kw: float
+    wind_kw: float
+    total_generation_kw: float
+    load_kw: float
+    battery_soc_pct: float
+    battery_power_kw: float
+    grid_import_kw: float
+    grid_export_kw: float
+    self_consumption_pct: float
+    co2_saved_kg: float
+    cost_saved_inr: float
+    active_strategy: NotRequired[str]
+
+
+def process_sensor_payload(raw_payload: dict, timestamp: Optional[datetime] = None) -> SensorReading:
     """
     Validates and formats an incoming sensor payload.
     In a real system, this would handle MQTT/REST payloads.
     Here, it ensures the simulator's output is consistently formatted.
+    The result is a plain dict (typed as SensorReading) so call sites
+    can keep updating it in place.
     """
-    # 1. Ensure timestamp
+    get = raw_payload.get
+
+    # 1. Ensure timestamp (only fall back to "now" when the key is absent)
     if timestamp is None:
-        timestamp = raw_payload.get("timestamp_utc", datetime.utcnow())
+        timestamp = raw_payload["timestamp_utc"] if "timestamp_utc" in raw_payload else datetime.utcnow()
 
     # 2. Extract and validate required fields
-    processed_reading = {
+    processed_reading: SensorReading = {
         "timestamp_utc": timestamp,
-        "solar_kw": max(0.0, float(raw_payload.get("solar_kw", 0.0))),
-        "wind_kw": max(0.0, float(raw_payload.get("wind_kw", 0.0))),
-        "total_generation_kw": max(0.0, float(raw_payload.get("total_generation_kw", 0.0))),
-        "load_kw": max(0.0, float(raw_payload.get("load_kw", 0.0))),
-        "battery_soc_pct": max(0.0, min(100.0, float(raw_payload.get("battery_soc_pct", 50.0)))),
-        "battery_power_kw": float(raw_payload.get("battery_power_kw", 0.0)),
-        "grid_import_kw": max(0.0, float(raw_payload.get("grid_import_kw", 0.0))),
-        "grid_export_kw": max(0.0, float(raw_payload.get("grid_export_kw", 0.0))),
-        "self_consumption_pct": max(0.0, min(100.0, float(raw_payload.get("self_consumption_pct", 0.0)))),
-        "co2_saved_kg": float(raw_payload.get("co2_saved_kg", 0.0)),
-        "cost_saved_inr": float(raw_payload.get("cost_saved_inr", 0.0)),
+        "solar_kw": max(0.0, float(get("solar_kw", 0.0))),
+        "wind_kw": max(0.0, float(get("wind_kw", 0.0))),
+        "total_generation_kw": max(0.0, float(get("total_generation_kw", 0.0))),
+        "load_kw": max(0.0, float(get("load_kw", 0.0))),
+        "battery_soc_pct": max(0.0, min(100.0, float(get("battery_soc_pct", 50.0)))),
+        "battery_power_kw": float(get("battery_power_kw", 0.0)),
+        "grid_import_kw": max(0.0, float(get("grid_import_kw", 0.0))),
+        "grid_export_kw": max(0.0, float(get("grid_export_kw", 0.0))),
+        "self_consumption_pct": max(0.0, min(100.0, float(get("self_consumption_pct", 0.0)))),
+        "co2_saved_kg": float(get("co2_saved_kg", 0.0)),
+        "cost_saved_inr": float(get("cost_saved_inr", 0.0)),
     }
 
     # 3. Handle optional strategy label
     # This might come from the optimization engine or default to rules
-    strategy = raw_payload.get("active_strategy")
+    strategy = get("active_strategy")
     if strategy:
         processed_reading["active_strategy"] = str(strategy)
         
     return processed_reading
 
-def format_for_websocket(reading: dict, recommendations: Optional[list] = None) -> dict:
+def format_for_websocket(reading: dict, recommendations: Optional[list] = None) -> bytes:
     """
     Formats the processed reading and any active recommendations
-    for broadcasting over the WebSocket.
+    for broadcasting over the WebSocket, encoded as UTF-8 JSON bytes.
+    orjson writes datetimes as ISO 8601 itself, so the reading is
+    serialised as-is.
     """
-    # Convert datetime objects to ISO 8601 strings for JSON serialization
-    serialized_reading = {k: v.isoformat() if isinstance(v, datetime) else v for k, v in reading.items()}
-    
-    return {
+    return orjson.dumps({
         "type": "SENSOR_UPDATE",
-        "data": serialized_reading,
+        "data": reading,
         "recommendations": recommendations or []
-    }
+    })
@@ -6,33 +6,51 @@ Exposes REST endpoints + WebSocket for real-time energy data streaming.
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, Query
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc, func
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from datetime import datetime, timezone, date, timedelta
 import asyncio
-import json
 import csv
 import io
+import logging
+import time
+import orjson
 
-from database import init_db, get_db, EnergyReading, Recommendation
-from simulator import SensorState, generate_reading, generate_recommendations
-from forecast import fetch_solar_wind_forecast, get_current_cloudcover
+from database import (
+    init_db, get_db, bulk_insert_readings, replace_active_recommendations, rollup_daily_summaries,
+    AsyncSessionLocal, EnergyReading, READING_INTERVAL_H,
+)
+from simulator import (
+    SensorState, generate_reading, generate_recommendations,
+    BATTERY_CAP_KWH, BATTERY_MAX_KW,
+)
+from optimization import optimize_power_flow
+from config import OptimizationConfig, current_opt_config
+from forecast import fetch_solar_wind_forecast, get_current_cloudcover, close_forecast_client
 
 from ingestion import process_sensor_payload, format_for_websocket
 
 # ── Shared simulator state ────────────────────────────────────────────────────
 sensor_state     = SensorState()
 latest_reading: dict = {}
-active_ws_clients: list[WebSocket] = []
-scheduler        = AsyncIOScheduler()
+# Active recommendations as /current returns them, refreshed whenever a new
+# set is written so the endpoint never has to query the database
+latest_recs_cache: list[dict] = []
+active_ws_clients: set["_WsClient"] = set()
+TICK_INTERVAL_S  = 5.0
+# Reused by every tick (the ticker never overlaps runs); opened in lifespan
+tick_session: AsyncSession | None = None
+# UTC day last rolled up into daily_summaries (None until the first tick)
+last_rollup_day: date | None = None
+logger = logging.getLogger(__name__)
 
 
 # ── Background job: simulate + broadcast every 5 seconds ─────────────────────
 async def tick():
-    global latest_reading
+    global latest_reading, latest_recs_cache, last_rollup_day
     try:
         cloud_cover    = await get_current_cloudcover()
     except Exception:
@@ -42,47 +60,68 @@ async def tick():
     reading = process_sensor_payload(raw_reading)
     latest_reading = reading
 
+    surplus = 0.0   # could fetch forecast here; kept lightweight for tick
+    recs = generate_recommendations(reading, surplus)
+
+    # Broadcast first: clients don't need to wait on the commit. This only
+    # queues the frame; the per-client writers send while we persist below.
+    if active_ws_clients:
+        _broadcast(format_for_websocket(reading, recs))
+
     # Persist to DB
-    from database import AsyncSessionLocal
-    async with AsyncSessionLocal() as db:
+    db = tick_session
+    try:
         row = EnergyReading(**{k: v for k, v in reading.items() if k not in ("timestamp_utc", "active_strategy")})
         db.add(row)
-
-        # Generate + persist recommendations
-        surplus = 0.0   # could fetch forecast here; kept lightweight for tick
-        recs = generate_recommendations(reading, surplus)
-        # deactivate previous recommendations
-        await db.execute(
-            Recommendation.__table__.update().where(Recommendation.is_active == True).values(is_active=False)
-        )
-        for rec in recs:
-            db.add(Recommendation(**rec))
-
+        # deactivate previous recommendations, insert the new set
+        await replace_active_recommendations(db, recs)
+        # Daily rollup: all history on the first tick, then at each UTC day
+        # change the day that just ended (and the one starting)
+        today = datetime.now(timezone.utc).date()
+        if today != last_rollup_day:
+            await rollup_daily_summaries(db, since=last_rollup_day)
         await db.commit()
+        # Only once stored, so /current never shows a set that was rolled back
+        latest_recs_cache = _recs_for_current(recs)
+        last_rollup_day = today
+    except Exception:
+        await db.rollback()
+        raise
 
-    # Broadcast to all WebSocket clients
-    if active_ws_clients:
-        payload = json.dumps(format_for_websocket(reading, recs))
-        dead = []
-        for ws in active_ws_clients:
-            try:
-                await ws.send_text(payload)
-            except Exception:
-                dead.append(ws)
-        for d in dead:
-            active_ws_clients.remove(d)
+
+async def _ticker():
+    """
+    Run tick() every TICK_INTERVAL_S on the event loop. Deadlines advance
+    from a monotonic base so the period doesn't drift by tick()'s runtime;
+    slots missed by a slow tick are skipped rather than run back to back.
+    """
+    next_t = time.monotonic()
+    while True:
+        next_t += TICK_INTERVAL_S
+        now = time.monotonic()
+        if next_t < now:
+            next_t += (now - next_t) // TICK_INTERVAL_S * TICK_INTERVAL_S + TICK_INTERVAL_S
+        await asyncio.sleep(next_t - now)
+        try:
+            await tick()
+        except Exception:
+            logger.exception("Simulator tick failed")
 
 
 # ── Lifespan (startup/shutdown) ───────────────────────────────────────────────
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    global tick_session
     await init_db()
-    scheduler.add_job(tick, "interval", seconds=5, id="sensor_tick")
-    scheduler.start()
+    tick_session = AsyncSessionLocal()
     # Pre-run one tick so /api/current always returns data
     await tick()
+    ticker = asyncio.create_task(_ticker())
     yield
-    scheduler.shutdown()
+    ticker.cancel()
+    await asyncio.gather(ticker, return_exceptions=True)
+    await tick_session.close()
+    await close_forecast_client()
 
 
 # ── App instance ──────────────────────────────────────────────────────────────
@@ -112,24 +151,23 @@ async def health():
     return {"status": "ok", "service": "GridZen VPP API", "timestamp": datetime.now(timezone.utc).isoformat()}
 
 
+def _recs_for_current(recs: list[dict]) -> list[dict]:
+    """Shape a freshly generated set like the active rows, newest id first."""
+    return [
+        {
+            "action":   r["action"],
+            "priority": r["priority"],
+            "message":  r["message"],
+            "reason":   r["reason"],
+        }
+        for r in reversed(recs)
+    ]
+
+
 @app.get("/api/v1/current")
 async def get_current():
-    """Latest sensor snapshot + active recommendations."""
-    from database import AsyncSessionLocal
-    async with AsyncSessionLocal() as db:
-        recs_result = await db.execute(
-            select(Recommendation).where(Recommendation.is_active == True).order_by(desc(Recommendation.id))
-        )
-        recs = [
-            {
-                "action":   r.action,
-                "priority": r.priority,
-                "message":  r.message,
-                "reason":   r.reason,
-            }
-            for r in recs_result.scalars().all()
-        ]
-    return {"reading": latest_reading, "recommendations": recs}
+    """Latest sensor snapshot + active recommendations (served from memory)."""
+    return {"reading": latest_reading, "recommendations": latest_recs_cache}
 
 
 @app.get("/api/v1/forecast")
@@ -138,12 +176,6 @@ async def get_forecast(hours: int = Query(default=24, ge=6, le=48)):
     data = await fetch_solar_wind_forecast(hours_ahead=hours)
     return data
 
-class OptimizationConfig(BaseModel):
-    mode: str = "AUTO"  # "AUTO", "MANUAL_CHARGE", "MANUAL_DISCHARGE"
-    manual_override_kw: float = 0.0
-
-current_opt_config = OptimizationConfig()
-
 class IngestPayload(BaseModel):
     timestamp_utc: str | None = None
     solar_kw: float = 0.0
@@ -151,21 +183,18 @@ class IngestPayload(BaseModel):
     load_kw: float = 0.0
     battery_soc_pct: float = 50.0
 
-@app.post("/api/v1/ingest")
-async def ingest_data(payload: IngestPayload, db: AsyncSession = Depends(get_db)):
-    """Push custom sensor data into the GridZen platform."""
-    global latest_reading
+class IngestBatchPayload(BaseModel):
+    readings: list[IngestPayload]
+
+
+def _process_ingest(payload: IngestPayload) -> dict:
+    """Run one pushed reading through the optimizer and advance the tracked SOC."""
     # 1. Process payload to format
     raw_payload = payload.model_dump()
     reading = process_sensor_payload(raw_payload)
 
     # 2. Extract real SOC, or fallback to tracking it dynamically
     # Use global sensor_state to track battery charge over time instead of resetting it
-    global sensor_state
-    
-    from optimization import optimize_power_flow
-    from simulator import BATTERY_CAP_KWH, BATTERY_MAX_KW
-    
     # Very simple 3h surplus model since we don't have local time
     # This just guarantees the app doesn't crash on custom data
     opt_result = optimize_power_flow(
@@ -196,87 +225,182 @@ async def ingest_data(payload: IngestPayload, db: AsyncSession = Depends(get_db)
     total_gen = reading["solar_kw"] + reading["wind_kw"]
     reading["total_generation_kw"] = total_gen
     reading["self_consumption_pct"] = round(min(100.0, (total_gen / max(1, reading["load_kw"]) * 100)), 1)
+    return reading
+
+
+def _row_values(reading: dict) -> dict:
+    """EnergyReading column values for a processed reading."""
+    return {k: v for k, v in reading.items() if k not in ("timestamp_utc", "active_strategy")}
+
+
+# Frames buffered per WebSocket client; beyond this the oldest is dropped
+WS_QUEUE_SIZE = 16
+
+
+@dataclass(eq=False)
+class _WsClient:
+    """
+    A connected dashboard: its socket, outgoing queue and writer task.
+    Hashed by identity so clients live in a set with O(1) removal.
+    """
+    ws: WebSocket
+    queue: asyncio.Queue
+    task: asyncio.Task
+
+
+def _enqueue(queue: asyncio.Queue, payload: bytes):
+    """Queue a frame without waiting; a full queue drops its oldest frame."""
+    try:
+        queue.put_nowait(payload)
+    except asyncio.QueueFull:
+        queue.get_nowait()
+        queue.put_nowait(payload)
+
+
+def _broadcast(payload: bytes):
+    """
+    Queue one pre-encoded message for every connected WebSocket client.
+    The same bytes object goes to every queue; it is serialised once per
+    broadcast and (with per-message deflate disabled) never re-encoded.
+    Never waits on the network: each client's writer task does the send,
+    so a slow client only ever delays itself.
+    """
+    for client in active_ws_clients:
+        _enqueue(client.queue, payload)
+
 
+async def _ws_writer(ws: WebSocket, queue: asyncio.Queue):
+    """Send queued frames to one client until a send fails."""
+    try:
+        while True:
+            await ws.send_bytes(await queue.get())
+    except Exception:
+        pass
+
+
+@app.post("/api/v1/ingest")
+async def ingest_data(payload: IngestPayload, db: AsyncSession = Depends(get_db)):
+    """Push custom sensor data into the GridZen platform."""
+    global latest_reading, latest_recs_cache
+    reading = _process_ingest(payload)
     
     # 3. Update active state
     latest_reading = reading
     
     # 4. Save to database
-    row = EnergyReading(**{k: v for k, v in reading.items() if k not in ("timestamp_utc", "active_strategy")})
+    row = EnergyReading(**_row_values(reading))
     db.add(row)
     
     # 5. Generate and persist recommendations based on custom data
     recs = generate_recommendations(reading, 0.0)
-    await db.execute(
-        Recommendation.__table__.update().where(Recommendation.is_active == True).values(is_active=False)
-    )
-    for rec in recs:
-        db.add(Recommendation(**rec))
+    await replace_active_recommendations(db, recs)
         
     await db.commit()
+    latest_recs_cache = _recs_for_current(recs)
     
     # 6. Push to WebSocket
     if active_ws_clients:
-        ws_payload = json.dumps(format_for_websocket(reading, recs))
-        dead = []
-        for ws in active_ws_clients:
-            try:
-                await ws.send_text(ws_payload)
-            except Exception:
-                dead.append(ws)
-        for d in dead:
-            active_ws_clients.remove(d)
+        _broadcast(format_for_websocket(reading, recs))
             
     return {"status": "success", "message": "Data ingested and broadcasted successfully", "reading": reading}
 
 
-current_opt_config = OptimizationConfig()
+@app.post("/api/v1/ingest_batch")
+async def ingest_batch(payload: IngestBatchPayload, db: AsyncSession = Depends(get_db)):
+    """
+    Push several sensor readings in one request. Readings are processed in
+    order, inserted with a single executemany, and only the last one is
+    broadcast and used for recommendations.
+    """
+    global latest_reading, latest_recs_cache
+    readings = [_process_ingest(p) for p in payload.readings]
+    if not readings:
+        return {"status": "success", "message": "No readings supplied", "readings": []}
+
+    latest_reading = readings[-1]
+    await bulk_insert_readings(db, [_row_values(r) for r in readings])
+
+    recs = generate_recommendations(latest_reading, 0.0)
+    await replace_active_recommendations(db, recs)
+
+    await db.commit()
+    latest_recs_cache = _recs_for_current(recs)
+
+    if active_ws_clients:
+        _broadcast(format_for_websocket(latest_reading, recs))
+
+    return {"status": "success", "message": f"{len(readings)} readings ingested", "readings": readings}
+
 
 @app.post("/api/v1/optimization/config")
 async def configure_optimization(config: OptimizationConfig):
     """Update dynamic optimization settings."""
-    global current_opt_config
-    current_opt_config = config
+    # Mutate the shared object: the simulator holds a reference to it
+    for field, value in config:
+        setattr(current_opt_config, field, value)
     return {"status": "success", "config": current_opt_config.model_dump()}
 
+HISTORY_COLUMNS = (
+    EnergyReading.id,
+    EnergyReading.timestamp,
+    EnergyReading.solar_kw,
+    EnergyReading.wind_kw,
+    EnergyReading.total_generation_kw,
+    EnergyReading.load_kw,
+    EnergyReading.battery_soc_pct,
+    EnergyReading.battery_power_kw,
+    EnergyReading.grid_import_kw,
+    EnergyReading.grid_export_kw,
+    EnergyReading.self_consumption_pct,
+    EnergyReading.co2_saved_kg,
+    EnergyReading.cost_saved_inr,
+)
+
+
 @app.get("/api/v1/history")
 async def get_history(
     limit: int = Query(default=288, ge=1, le=2016),  # 288 = 24h at 5-min intervals
+    after_id: int | None = Query(default=None, ge=0),
     db: AsyncSession = Depends(get_db),
 ):
-    """Recent energy readings in reverse-chronological order."""
-    result = await db.execute(
-        select(EnergyReading).order_by(desc(EnergyReading.id)).limit(limit)
+    """
+    Energy readings in chronological order. Without after_id, the most recent
+    `limit` readings; with it, the next `limit` readings after that id
+    (keyset pagination on the primary key: pass the last id you received).
+    """
+    if after_id is None:
+        latest = (
+            select(*HISTORY_COLUMNS).order_by(desc(EnergyReading.id)).limit(limit).subquery()
+        )
+        stmt = select(latest).order_by(latest.c.id)
+    else:
+        stmt = (
+            select(*HISTORY_COLUMNS)
+            .where(EnergyReading.id > after_id)
+            .order_by(EnergyReading.id)
+            .limit(limit)
+        )
+    result = await db.execute(stmt)
+    # orjson writes the naive timestamps in the same ISO form as isoformat()
+    return Response(
+        content=orjson.dumps([row._asdict() for row in result]),
+        media_type="application/json",
     )
-    rows = result.scalars().all()
-    return [
-        {
-            "timestamp":            r.timestamp.isoformat(),
-            "solar_kw":             r.solar_kw,
-            "wind_kw":              r.wind_kw,
-            "total_generation_kw":  r.total_generation_kw,
-            "load_kw":              r.load_kw,
-            "battery_soc_pct":      r.battery_soc_pct,
-            "battery_power_kw":     r.battery_power_kw,
-            "grid_import_kw":       r.grid_import_kw,
-            "grid_export_kw":       r.grid_export_kw,
-            "self_consumption_pct": r.self_consumption_pct,
-            "co2_saved_kg":         r.co2_saved_kg,
-            "cost_saved_inr":       r.cost_saved_inr,
-        }
-        for r in reversed(rows)   # chronological for charting
-    ]
 
 
 @app.get("/api/v1/summary")
 async def get_summary(db: AsyncSession = Depends(get_db)):
     """
-    Aggregated stats for today and last 7 days.
-    Falls back to live computation from readings table.
+    Aggregated stats for the last 7 days (total_*) and today (today_*),
+    computed live from the readings table.
     """
-    today_str = date.today().isoformat()
-    week_ago  = (date.today() - timedelta(days=6)).isoformat()
+    # Timestamps are stored as naive UTC; the week is today plus the 6 days before
+    now_utc     = datetime.now(timezone.utc).replace(tzinfo=None)
+    today_start = datetime.combine(now_utc.date(), datetime.min.time())
+    week_start  = today_start - timedelta(days=6)
+    is_today    = EnergyReading.timestamp >= today_start
 
+    # One pass over the timestamp-indexed week; today's figures are FILTERed sums
     result = await db.execute(
         select(
             func.sum(EnergyReading.solar_kw).label("solar_kwh"),
@@ -287,12 +411,17 @@ async def get_summary(db: AsyncSession = Depends(get_db)):
             func.sum(EnergyReading.cost_saved_inr).label("cost_total"),
             func.avg(EnergyReading.self_consumption_pct).label("avg_self_consumption"),
             func.count(EnergyReading.id).label("n_readings"),
-        )
+            func.sum(EnergyReading.solar_kw).filter(is_today).label("solar_today"),
+            func.sum(EnergyReading.wind_kw).filter(is_today).label("wind_today"),
+            func.sum(EnergyReading.load_kw).filter(is_today).label("load_today"),
+            func.sum(EnergyReading.co2_saved_kg).filter(is_today).label("co2_today"),
+            func.sum(EnergyReading.cost_saved_inr).filter(is_today).label("cost_today"),
+            func.count(EnergyReading.id).filter(is_today).label("n_today"),
+        ).where(EnergyReading.timestamp >= week_start)
     )
     row = result.one()
     # Scale: each reading represents 5 seconds → 5/3600 hours
-    dt_h = 5 / 3600
-    scale = dt_h if (row.n_readings or 0) > 0 else 1
+    scale = READING_INTERVAL_H
 
     return {
         "total_solar_kwh":         round((row.solar_kwh or 0) * scale, 2),
@@ -303,43 +432,68 @@ async def get_summary(db: AsyncSession = Depends(get_db)):
         "total_cost_saved_inr":    round((row.cost_total or 0), 2),
         "avg_self_consumption_pct": round(row.avg_self_consumption or 0, 1),
         "n_readings":              row.n_readings or 0,
+        "today_solar_kwh":         round((row.solar_today or 0) * scale, 2),
+        "today_wind_kwh":          round((row.wind_today or 0) * scale, 2),
+        "today_load_kwh":          round((row.load_today or 0) * scale, 2),
+        "today_co2_saved_kg":      round((row.co2_today or 0), 2),
+        "today_cost_saved_inr":    round((row.cost_today or 0), 2),
+        "n_readings_today":        row.n_today or 0,
     }
 
 
+CSV_HEADER = [
+    "Timestamp", "Solar (kW)", "Wind (kW)", "Total Gen (kW)",
+    "Load (kW)", "Battery SOC (%)", "Battery Power (kW)",
+    "Grid Import (kW)", "Grid Export (kW)",
+    "Self Consumption (%)", "CO2 Saved (kg)", "Cost Saved (INR)",
+]
+
+CSV_CHUNK_ROWS = 1000
+
+
+async def _stream_csv(since: datetime):
+    """
+    Yield the export as CSV text while rows are fetched from the database,
+    one chunk per CSV_CHUNK_ROWS rows. Owns its session: a dependency-injected
+    one would already be closed by the time the response body is streamed.
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(CSV_HEADER)
+    pending = 0
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(
+            select(EnergyReading)
+            .where(EnergyReading.timestamp >= since)
+            .order_by(EnergyReading.timestamp)
+            .execution_options(yield_per=CSV_CHUNK_ROWS)
+        )
+        async for r in result.scalars():
+            writer.writerow([
+                r.timestamp.isoformat(), r.solar_kw, r.wind_kw,
+                r.total_generation_kw, r.load_kw, r.battery_soc_pct,
+                r.battery_power_kw, r.grid_import_kw, r.grid_export_kw,
+                r.self_consumption_pct, r.co2_saved_kg, r.cost_saved_inr,
+            ])
+            pending += 1
+            if pending == CSV_CHUNK_ROWS:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+                pending = 0
+
+    yield buf.getvalue()
+
+
 @app.get("/api/v1/export/csv")
-async def export_csv(
-    days: int = Query(default=7, ge=1, le=30),
-    db: AsyncSession = Depends(get_db),
-):
+async def export_csv(days: int = Query(default=7, ge=1, le=30)):
     """Export historical readings as a downloadable CSV (for regulatory reporting)."""
-    since = datetime.now(timezone.utc) - timedelta(days=days)
-    result = await db.execute(
-        select(EnergyReading)
-        .where(EnergyReading.timestamp >= since)
-        .order_by(EnergyReading.timestamp)
-    )
-    rows = result.scalars().all()
-
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow([
-        "Timestamp", "Solar (kW)", "Wind (kW)", "Total Gen (kW)",
-        "Load (kW)", "Battery SOC (%)", "Battery Power (kW)",
-        "Grid Import (kW)", "Grid Export (kW)",
-        "Self Consumption (%)", "CO2 Saved (kg)", "Cost Saved (INR)",
-    ])
-    for r in rows:
-        writer.writerow([
-            r.timestamp.isoformat(), r.solar_kw, r.wind_kw,
-            r.total_generation_kw, r.load_kw, r.battery_soc_pct,
-            r.battery_power_kw, r.grid_import_kw, r.grid_export_kw,
-            r.self_consumption_pct, r.co2_saved_kg, r.cost_saved_inr,
-        ])
-
-    output.seek(0)
+    # Timestamps are stored as naive UTC; asyncpg rejects an aware bound value
+    since = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days)
     filename = f"gridzen_report_{date.today().isoformat()}.csv"
     return StreamingResponse(
-        iter([output.getvalue()]),
+        _stream_csv(since),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename={filename}"},
     )
@@ -354,17 +508,22 @@ async def websocket_live(websocket: WebSocket):
     every ~5 seconds without polling.
     """
     await websocket.accept()
-    active_ws_clients.append(websocket)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=WS_QUEUE_SIZE)
     # Send the latest reading immediately on connect
     if latest_reading:
         recs = generate_recommendations(latest_reading)
-        await websocket.send_text(json.dumps(format_for_websocket(latest_reading, recs)))
+        queue.put_nowait(format_for_websocket(latest_reading, recs))
+    client = _WsClient(websocket, queue, asyncio.create_task(_ws_writer(websocket, queue)))
+    active_ws_clients.add(client)
     try:
         while True:
-            # Keep connection alive; actual data is pushed by the scheduler tick
-            await asyncio.sleep(1)
+            # Data is pushed by the writer task; receiving here only serves
+            # to notice the disconnect (incoming messages are ignored)
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
     except WebSocketDisconnect:
         pass
     finally:
-        if websocket in active_ws_clients:
-            active_ws_clients.remove(websocket)
+        client.task.cancel()
+        active_ws_clients.discard(client)
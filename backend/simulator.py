@@ -6,12 +6,17 @@ using sinusoidal curves + Gaussian noise, mimicking a Jaipur campus.
 
 import math
 import random
+from functools import lru_cache
 import numpy as np
 from datetime import datetime, timezone
 from dataclasses import dataclass, field
 import os
 from dotenv import load_dotenv
 
+from load_profile import load_profile, load_profile_vec, rng
+from optimization import optimize_power_flow
+from config import current_opt_config
+
 load_dotenv()
 
 # ── Campus hardware specs (from .env) ──────────────────────────────────────
@@ -35,36 +40,92 @@ class SensorState:
 
 # ── Irradiance profile ───────────────────────────────────────────────────────
 
-def _solar_irradiance_factor(hour: float, cloud_cover_pct: float = 0.0) -> float:
+# The noise-free envelopes only depend on the hour, so they are cached per
+# 5-minute bucket (hour * 12); keys cover hour + forecast offsets (< 27 h).
+
+@lru_cache(maxsize=512)
+def _solar_base(bucket: int) -> float | None:
+    """Cloud-free solar envelope for a 5-minute bucket, or None at night."""
+    # Jaipur sunrise ≈ 06:30, sunset ≈ 18:30 local
+    local_hour = bucket / 12 + 5.5
+    if local_hour < 6.5 or local_hour > 18.5:
+        return None
+    # Sinusoidal rise/fall
+    angle = math.pi * (local_hour - 6.5) / 12.0
+    return math.sin(angle) ** 1.2
+
+
+@lru_cache(maxsize=512)
+def _wind_base(bucket: int) -> float:
+    """Noise-free wind envelope for a 5-minute bucket."""
+    local_hour = (bucket / 12 + 5.5) % 24
+    # Stronger at night (22:00–08:00), lighter midday
+    return 0.6 + 0.4 * math.cos(math.pi * (local_hour - 3) / 12)
+
+
+def _solar_irradiance_factor(hour: float, cloud_cover_pct: float = 0.0, noise: bool = True) -> float:
     """
     Returns a 0–1 multiplier for solar generation based on time of day.
     Peaks at solar noon (hour ≈ 12.5 for Jaipur, UTC+5:30).
+    noise=False gives the deterministic envelope used for forecasting.
     """
-    # Jaipur sunrise ≈ 06:30, sunset ≈ 18:30 local
-    local_hour = hour + 5.5
-    if local_hour < 6.5 or local_hour > 18.5:
+    base = _solar_base(round(hour * 12))
+    if base is None:
         return 0.0
-    # Sinusoidal rise/fall
-    angle = math.pi * (local_hour - 6.5) / 12.0
-    base = math.sin(angle) ** 1.2
     cloud_factor = 1.0 - (cloud_cover_pct / 100.0) * 0.85
-    noise = random.gauss(0, 0.03)
-    return max(0.0, min(1.0, base * cloud_factor + noise))
+    jitter = random.gauss(0, 0.03) if noise else 0.0
+    return max(0.0, min(1.0, base * cloud_factor + jitter))
 
 
-def _wind_speed_factor(hour: float) -> float:
+def _wind_speed_factor(hour: float, noise: bool = True) -> float:
     """
     Rajasthan wind is stronger at night and early morning.
     Returns 0–1 multiplier (Weibull-inspired envelope with noise).
     """
-    local_hour = (hour + 5.5) % 24
-    # Stronger at night (22:00–08:00), lighter midday
-    base = 0.6 + 0.4 * math.cos(math.pi * (local_hour - 3) / 12)
-    wind_noise = random.gauss(0, 0.08)
+    base = _wind_base(round(hour * 12))
+    wind_noise = random.gauss(0, 0.08) if noise else 0.0
     return max(0.05, min(1.0, base + wind_noise))
 
 
-from forecast import _load_profile_kw
+# ── Vectorised profiles (forecast replays, backfill) ─────────────────────────
+
+def _solar_irradiance_factor_vec(hours, cloud_cover_pct=0.0, noise: bool = True) -> np.ndarray:
+    """Array form of _solar_irradiance_factor over UTC hours (cloud may be scalar or array)."""
+    local_hour = np.asarray(hours, dtype=float) + 5.5
+    daylight = (local_hour >= 6.5) & (local_hour <= 18.5)
+    angle = np.pi * (local_hour - 6.5) / 12.0
+    base = np.sin(np.where(daylight, angle, 0.0)) ** 1.2
+    cloud_factor = 1.0 - (np.asarray(cloud_cover_pct, dtype=float) / 100.0) * 0.85
+    factor = base * cloud_factor
+    if noise:
+        factor = factor + rng.normal(0, 0.03, size=local_hour.shape)
+    return np.where(daylight, np.clip(factor, 0.0, 1.0), 0.0)
+
+
+def _wind_speed_factor_vec(hours, noise: bool = True) -> np.ndarray:
+    """Array form of _wind_speed_factor over UTC hours."""
+    local_hour = (np.asarray(hours, dtype=float) + 5.5) % 24
+    base = 0.6 + 0.4 * np.cos(np.pi * (local_hour - 3) / 12)
+    if noise:
+        base = base + rng.normal(0, 0.08, size=local_hour.shape)
+    return np.clip(base, 0.05, 1.0)
+
+
+
+_SURPLUS_STEPS_H = np.arange(1.0, 4.0)
+
+
+@lru_cache(maxsize=512)
+def _surplus_3h(bucket_5min: int, cloud_bucket: int) -> float:
+    """
+    Expected generation surplus (kWh) over the next 3 hours, from the
+    noise-free profiles. Keyed on 5-minute buckets of the UTC hour and whole
+    percent cloud cover, so it is recomputed at most once per 5 minutes.
+    """
+    hours = bucket_5min / 12.0 + _SURPLUS_STEPS_H
+    gen = (SOLAR_CAP_KW * _solar_irradiance_factor_vec(hours, cloud_bucket, noise=False)
+           + WIND_CAP_KW * _wind_speed_factor_vec(hours, noise=False))
+    return float((gen - load_profile_vec(hours, noisy=False)).sum())
 
 # ── Core reading generator ────────────────────────────────────────────────────
 
@@ -95,21 +156,12 @@ def generate_reading(state: SensorState, cloud_cover_pct: float = 0.0) -> dict:
     total_gen = round(solar_kw + wind_kw, 2)
 
     # ── Load ─────────────────────────────────────────────────────────────────
-    load_kw = round(_load_profile_kw(hour_utc), 2)
+    load_kw = round(load_profile(hour_utc), 2)
 
     # ── Power balance & battery logic ─────────────────────────────────────────
     # We now use the optimization engine for this logic
-    from optimization import optimize_power_flow
-    from main import current_opt_config
-    
-    # Calculate a simple local 3h surplus forecast for the optimizer
-    surplus_3h = 0.0
-    for h in range(1, 4):
-        _sf = _solar_irradiance_factor(hour_utc + h, cloud_cover_pct)
-        _wf = _wind_speed_factor(hour_utc + h)
-        _gen = SOLAR_CAP_KW * _sf + WIND_CAP_KW * _wf
-        _ld = _load_profile_kw(hour_utc + h)
-        surplus_3h += (_gen - _ld)
+    # Simple local 3h surplus forecast for the optimizer (cached per 5 min)
+    surplus_3h = _surplus_3h(int(hour_utc * 12), int(cloud_cover_pct))
     
     opt_result = optimize_power_flow(
         current_solar_kw=solar_kw,
@@ -4,6 +4,8 @@
 import { useState, useEffect, useRef, useCallback } from 'react'
 
 const WS_URL = `ws://${window.location.hostname}:8000/ws/live`
+// The server sends UTF-8 JSON as binary frames
+const decoder = new TextDecoder()
 
 export function useWebSocket() {
     const [reading, setReading] = useState(null)
@@ -15,6 +17,7 @@ export function useWebSocket() {
     const connect = useCallback(() => {
         try {
             const ws = new WebSocket(WS_URL)
+            ws.binaryType = 'arraybuffer'
             wsRef.current = ws
 
             ws.onopen = () => setConnected(true)
@@ -25,7 +28,7 @@ export function useWebSocket() {
             ws.onerror = () => ws.close()
             ws.onmessage = (e) => {
                 try {
-                    const msg = JSON.parse(e.data)
+                    const msg = JSON.parse(typeof e.data === 'string' ? e.data : decoder.decode(e.data))
                     if (msg.type === 'reading' || msg.type === 'SENSOR_UPDATE') {
                         setReading(msg.data)
                         setRecs(msg.recs || msg.recommendations || [])
@@ -1,4 +1,6 @@
 # Start GridZen Backend (run from project root)
 Write-Host "Starting GridZen Backend on http://localhost:8000 ..."
 Set-Location backend
-uvicorn main:app --reload --host 0.0.0.0 --port 8000
+# Per-message deflate is off: every client gets the same small JSON frame,
+# and compressing it once per client costs more than it saves on a LAN
+uvicorn main:app --reload --host 0.0.0.0 --port 8000 --ws-per-message-deflate false